@@ -1,15 +1,29 @@
 import streamlit as st
 import asyncio
 import os
+import time
 from dotenv import load_dotenv
-from typing import List, Dict, Any
-from agents import Runner, trace, gen_trace_id
-from workers import planner_agent, web_search_agent, video_search_agent, writer_agent
-from models.schemas import WebSearchItem
+from typing import List, Dict, Any, Optional
 
-# Initialize environment
+# Initialize environment before importing modules that read their settings from it
 load_dotenv(override=True)
 
+from models.schemas import WebSearchItem, ReportData
+from tools.single_flight import search_flight, agent_flight
+from tools.metrics import start_metrics_server
+from tools.serper_client import serper_breaker
+from pipeline import ResearchPipeline, PipelineEvent, get_report_store, get_checkpoint_store
+from pipeline.engine import ResearchResult
+from pipeline.jobs import JobQueue, get_job_queue
+from pipeline.report_store import REUSE_THRESHOLD
+
+# Seconds between refreshes while following a queued research job
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1.0))
+
+# Expose Prometheus metrics for this server process when configured
+if os.environ.get("METRICS_PORT"):
+    start_metrics_server(int(os.environ["METRICS_PORT"]))
+
 # Set page title and configuration
 st.set_page_config(
     page_title="AI Deep Research Assistant",
@@ -20,152 +34,292 @@ st.set_page_config(
 
 
 # Helper functions
-async def plan_searches(query: str):
-    """Use the planner_agent to plan which searches to run for the query"""
-    with st.status("Planning search strategy...", expanded=True) as status:
-        result = await Runner.run(planner_agent, f"query: {query}")
-
-        # Sort searches by priority (highest first)
-        sorted_searches = sorted(
-            result.final_output.searches,
-            key=lambda s: s.priority if hasattr(s, 'priority') else 5,
-            reverse=True
-        )
-
-        web_searches = [s for s in sorted_searches if s.search_type == 'web']
-        video_searches = [s for s in sorted_searches if s.search_type == 'video']
-
-        status.update(label="Search strategy complete!", state="complete", expanded=False)
-
-        # Return for display in UI
-        return sorted_searches, web_searches, video_searches, result.final_output.strategy
-
-
-async def perform_web_search(item: WebSearchItem):
-    """Use the web search agent to run a web search"""
-    priority = getattr(item, 'priority', 5)
-
-    input_text = f"search query: {item.query}\nreason for searching: {item.reason}"
-    result = await Runner.run(web_search_agent, input_text)
-
-    return {
-        "type": "web",
-        "query": item.query,
-        "reason": item.reason,
-        "priority": priority,
-        "result": result.final_output
-    }
-
-
-async def perform_video_search(item: WebSearchItem):
-    """Use the video search agent to run a video search"""
-    priority = getattr(item, 'priority', 6)
-
-    input_text = f"search query: {item.query}\nreason for searching: {item.reason}"
-    result = await Runner.run(video_search_agent, input_text)
-
-    return {
-        "type": "video",
-        "query": item.query,
-        "reason": item.reason,
-        "priority": priority,
-        "result": result.final_output
-    }
-
-
-async def perform_searches(searches: List[WebSearchItem]):
-    """Execute all planned searches in parallel for better performance"""
-    with st.status("Executing all searches in parallel...", expanded=True) as status:
-        st.write(f"Running {len(searches)} searches simultaneously...")
-
-        # Define a helper function to determine which search to perform
-        async def search(item):
-            if item.search_type == 'web':
-                return await perform_web_search(item)
-            elif item.search_type == 'video':
-                return await perform_video_search(item)
-
-        # Create tasks for all searches to run in parallel
-        tasks = [asyncio.create_task(search(item)) for item in searches]
-
-        # Execute all searches concurrently and wait for all to complete
-        results = await asyncio.gather(*tasks)
-
-        # Update status once all searches are done
-        status.update(label=f"All {len(searches)} searches completed successfully!", state="complete", expanded=False)
-
-        return results
-
-
-async def write_report(query: str, search_results: List[Dict[str, Any]]):
-    """Use the writer agent to write a comprehensive deep research report"""
-    with st.status("Creating comprehensive research report...", expanded=True) as status:
-        # Extract and format the search results
-        web_results = [r for r in search_results if r["type"] == "web"]
-        video_results = [r for r in search_results if r["type"] == "video"]
-
-        # Create a structured overview of sources and findings
-        web_sources_summary = "\n\n## WEB SOURCES OVERVIEW:\n\n"
-        web_sources_summary += "| Search Query | Key Topics Covered |\n"
-        web_sources_summary += "|-------------|--------------------|\n"
-        for res in web_results:
-            topics = res["query"].replace("2023", "").strip()
-            web_sources_summary += f"| {res['query']} | {topics} |\n"
-
-        # Detailed web findings
-        web_text = "\n\n## DETAILED WEB RESEARCH FINDINGS:\n\n"
-        for i, res in enumerate(web_results, 1):
-            web_text += f"### Source {i}: {res['query']}\n"
-            web_text += f"**Research Objective**: {res['reason']}\n\n"
-            web_text += f"**Findings**:\n{res['result']}\n\n"
-            web_text += "-" * 50 + "\n\n"
+def render_search_plan(searches: List[WebSearchItem]):
+    """Render the planned web and video searches"""
+    web_searches = [s for s in searches if s.search_type == 'web']
+    video_searches = [s for s in searches if s.search_type == 'video']
+
+    st.markdown("### Planned Searches")
+
+    # Display web searches
+    st.subheader(f"Web Searches ({len(web_searches)})")
+    for search in web_searches:
+        with st.expander(f"{search.query} (Priority: {search.priority})"):
+            st.write(f"**Reason:** {search.reason}")
+
+    # Display video searches
+    st.subheader(f"Video Searches ({len(video_searches)})")
+    for search in video_searches:
+        with st.expander(f"{search.query} (Priority: {search.priority})"):
+            st.write(f"**Reason:** {search.reason}")
+
+
+def render_search_result(res: Dict[str, Any]):
+    """Render a single web or video search result as an expander"""
+    label = f"{res['query']} (Priority: {res['priority']}"
+    if "elapsed" in res:
+        label += f", {res['elapsed']:.1f}s"
+    if res.get("mode") == "fast":
+        label += ", fast"
+    label += ")"
+
+    with st.expander(label):
+        if res["type"] == "web":
+            st.markdown(f"**Research Objective:** {res['reason']}")
+            st.markdown("**Findings:**")
+        else:
+            st.markdown(f"**Selection Purpose:** {res['reason']}")
+            st.markdown("**Available Content:**")
+        st.markdown(res['result'])
+
+
+def render_download_button(report: ReportData):
+    """Render the markdown download button for a report"""
+    st.download_button(
+        label="Download Report as Markdown",
+        data=report.markdown_report,
+        file_name="research_report.md",
+        mime="text/markdown"
+    )
+
+
+def render_resources(report: ReportData):
+    """Render key insights, recommended videos and follow-up questions"""
+    st.header("Key Resources")
+
+    # Display key insights
+    st.subheader("Key Insights")
+    for i, insight in enumerate(report.key_insights, 1):
+        st.markdown(f"{i}. {insight}")
+
+    # Display recommended videos
+    st.subheader("Recommended Videos")
+    for video in report.recommended_videos:
+        with st.expander(video.title):
+            st.markdown(f"**Creator:** {video.creator}")
+            st.markdown(f"**Link:** [{video.title}]({video.link})")
+            st.markdown(f"**Description:** {video.description}")
+
+    # Display follow-up questions
+    st.subheader("Further Research Questions")
+    for i, question in enumerate(report.follow_up_questions, 1):
+        st.markdown(f"{i}. {question}")
+
+
+def render_run_metrics(run_metrics: Dict[str, Any]):
+    """Render the timing, token and cost summary of a research run"""
+    with st.expander("Run Metrics"):
+        cols = st.columns(len(run_metrics["stages"]) + 1)
+        for col, (stage, seconds) in zip(cols, run_metrics["stages"].items()):
+            col.metric(stage.capitalize(), f"{seconds:.1f}s")
+        cols[-1].metric("Estimated cost", f"${run_metrics['cost_usd']:.4f}")
+        st.json(run_metrics)
+
+
+class ResearchProgressView:
+    """Render ResearchPipeline events live into the research tabs"""
+
+    def __init__(self, plan_tab, search_tab, report_tab):
+        with plan_tab:
+            st.header("Research Strategy")
+            self.plan_area = st.container()
 
-        # Video resources
-        video_text = "\n\n## VIDEO RESOURCES IDENTIFIED:\n\n"
-        for i, res in enumerate(video_results, 1):
-            video_text += f"### Video Source {i}: {res['query']}\n"
-            video_text += f"**Selection Purpose**: {res['reason']}\n\n"
-            video_text += f"**Available Content**:\n{res['result']}\n\n"
-            video_text += "-" * 50 + "\n\n"
+        with search_tab:
+            st.header("Search Results")
+            self.search_progress = st.container()
+            # Containers that are filled in as each search completes
+            st.subheader("Web Research Findings")
+            self.web_container = st.container()
+            st.subheader("Video Research Findings")
+            self.video_container = st.container()
 
-        # Creating a structured research brief for the writer agent
-        input_text = f"""# COMPREHENSIVE RESEARCH ASSIGNMENT
+        with report_tab:
+            st.header("Comprehensive Research Report")
+            self.report_progress = st.container()
+            # Placeholders filled in while the report streams and once it completes
+            st.subheader("Executive Summary")
+            self.summary_placeholder = st.empty()
+            self.summary_placeholder.caption("Available once the report is complete...")
+            st.subheader("Full Report")
+            self.report_placeholder = st.empty()
+            self.download_area = st.container()
+
+    def handle(self, event: PipelineEvent):
+        handler = getattr(self, f"on_{event.kind}", None)
+        if handler is not None:
+            handler(**event.data)
+
+    def on_plan_started(self, query):
+        self.plan_status = self.plan_area.status("Planning search strategy...", expanded=True)
+
+    def on_plan_completed(self, plan, searches, cached=False):
+        label = "Reused a search strategy from a similar query!" if cached else "Search strategy complete!"
+        self.plan_status.update(label=label, state="complete", expanded=False)
+        with self.plan_area:
+            st.markdown("**Overall Strategy:**")
+            st.write(plan.strategy)
+            render_search_plan(searches)
+
+    def on_searches_merged(self, merged):
+        with self.plan_area:
+            st.caption(f"Merged {len(merged)} near-duplicate searches:")
+            for dropped, kept in merged:
+                st.caption(f"\"{dropped.query}\" ({dropped.search_type}) into \"{kept.query}\" ({kept.search_type})")
+
+    def on_searches_started(self, total, max_concurrency):
+        self.search_status = self.search_progress.status("Executing searches in parallel...", expanded=True)
+        self.search_status.write(f"Running {total} searches, up to {max_concurrency} at a time...")
+
+    def on_search_completed(self, result):
+        self.search_status.write(f"Finished \"{result['query']}\" in {result['elapsed']:.1f}s")
+        with self.web_container if result["type"] == "web" else self.video_container:
+            render_search_result(result)
+
+    def on_search_failed(self, item, error):
+        self.search_status.write(f"Search failed: \"{item.query}\" ({error})")
+
+    def on_search_dropped(self, item):
+        self.search_status.write(f"Skipped low-priority search over budget: {item.query} (Priority: {item.priority})")
+
+    def on_searches_completed(self, results, total):
+        self.search_status.update(
+            label=f"{len(results)} of {total} searches completed successfully!", state="complete", expanded=False
+        )
 
-## Primary Research Query:
-{query}
+    def on_report_started(self, query, context):
+        self.report_status = self.report_progress.status("Synthesizing research findings...", expanded=True)
+        if context is None:
+            self.report_status.write("Writing report sections in parallel...")
+        elif "passages" in context:
+            self.report_status.write(
+                f"Selected {context['selected_passages']} of {context['passages']} passages from "
+                f"{context['included']} of {context['findings']} findings into ~{context['tokens']} tokens "
+                f"in {context['rerank_ms']} ms ({context['duplicate_passages']} duplicate passages skipped)"
+            )
+        else:
+            self.report_status.write(
+                f"Packed {context['included']} of {context['findings']} findings into ~{context['tokens']} tokens "
+                f"({context['dropped']} dropped, {context['truncated']} truncated, "
+                f"{context['duplicate_passages']} duplicate passages skipped)"
+            )
 
-## Research Scope:
-This is a request for a COMPREHENSIVE research report that must cover:
-1. Historical foundations and theoretical principles
-2. Current state-of-the-art and recent developments
-3. Technical details and mechanisms
-4. Applications across different domains
-5. Key players and their contributions
-6. Challenges, limitations, and debates
-7. Future directions and possibilities
-
-{web_sources_summary}
-
-{web_text}
-
-{video_text}
-
-## Report Requirements:
-1. Create an authoritative, comprehensive report (2500-3000+ words)
-2. Balance historical context with cutting-edge developments
-3. Include both foundational concepts AND technical details
-4. Cover the ENTIRE landscape of {query}
-5. Follow all formatting requirements from your instructions
-6. Use all available sources to create a definitive resource on this topic
-
-Remember to synthesize findings across all sources into a cohesive narrative, not just summarize individual search results.
-"""
-
-        status.update(label="Synthesizing research findings...", state="running")
-        result = await Runner.run(writer_agent, input_text)
-        status.update(label="Research report complete!", state="complete", expanded=False)
-
-        return result.final_output
+    def on_report_delta(self, text):
+        self.report_placeholder.markdown(text)
+
+    def on_report_completed(self, report):
+        self.report_status.update(label="Research report complete!", state="complete", expanded=False)
+        self.summary_placeholder.markdown(report.short_summary)
+        self.report_placeholder.markdown(report.markdown_report)
+        with self.download_area:
+            render_download_button(report)
+
+
+def render_past_research(query: str):
+    """Offer stored reports for the same or a highly similar query instead of a fresh run"""
+    matches = [m for m in get_report_store().find_similar(query, limit=3) if m.similarity >= REUSE_THRESHOLD]
+    if not matches:
+        return
+
+    st.info("Similar research has been done before. You can open a saved report instead of starting a new run.")
+    for match in matches:
+        researched_on = time.strftime("%Y-%m-%d %H:%M", time.localtime(match.created_at))
+        with st.expander(f"{match.query} ({researched_on}, {match.similarity:.0%} match)"):
+            st.markdown(match.short_summary)
+            if st.button("Open this report", key=f"open_report_{match.id}"):
+                stored = get_report_store().load(match.id)
+                st.session_state.search_plan = stored["searches"]
+                st.session_state.search_results = stored["search_results"]
+                st.session_state.report = stored["report"]
+                st.session_state.run_metrics = stored["metrics"]
+                st.session_state.research_completed = True
+                st.rerun()
+
+
+def render_failed_run() -> Optional[str]:
+    """Show what the last failed run completed, returning its id if the user resumes it"""
+    failed_run = st.session_state.failed_run
+    if failed_run is None:
+        return None
+
+    st.error(f"Research on \"{failed_run['query']}\" failed: {failed_run['error']}")
+    store = get_checkpoint_store()
+    checkpoint = store.load(failed_run["run_id"]) if store is not None and failed_run["run_id"] else None
+    if checkpoint is None:
+        return None
+
+    planned = "done" if checkpoint.plan is not None else "not done"
+    st.markdown(
+        f"Completed so far: plan {planned}, {len(checkpoint.results)} of {len(checkpoint.searches)} searches. "
+        "Resuming keeps this work and retries only what is missing or failed."
+    )
+    for key, error in checkpoint.failed.items():
+        st.caption(f"Failed search {key}: {error}")
+    if st.button("Resume research", key=f"resume_{checkpoint.run_id}"):
+        return checkpoint.run_id
+    return None
+
+
+def save_result(result: ResearchResult):
+    """Keep a finished run in the session so it stays on screen across reruns"""
+    st.session_state.search_plan = result.searches
+    st.session_state.search_results = result.search_results
+    st.session_state.report = result.report
+    st.session_state.run_metrics = result.metrics
+
+
+def stop_following_job():
+    st.session_state.job_id = None
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+
+def follow_job(queue: JobQueue, job_id: str):
+    """Render the progress of a queued research job, refreshing until a worker finishes it
+
+    Every refresh replays the job's recorded events into a fresh progress
+    view, so the page can be reloaded, or opened elsewhere via ?job=<id>.
+    """
+    job = queue.get(job_id)
+    if job is None:
+        st.warning("This research job no longer exists.")
+        stop_following_job()
+        return
+    if job.status == "completed":
+        save_result(queue.result(job_id))
+        st.session_state.research_completed = True
+        stop_following_job()
+        st.rerun()
+    if job.status == "failed":
+        # Completed stages are checkpointed under the run id, so the run can be resumed
+        st.session_state.failed_run = {"run_id": job.run_id, "query": job.query, "error": job.error}
+        stop_following_job()
+        st.rerun()
+
+    if job.status == "queued":
+        st.info(f"Research on \"{job.query}\" is queued, {queue.position(job_id)} jobs ahead. "
+                "It will start as soon as a worker is free.")
+    else:
+        st.caption(f"Researching \"{job.query}\" in the background (job {job_id})")
+
+    tab1, tab2, tab3, tab4 = st.tabs(["Research Plan", "Search Results", "Report", "Resources"])
+    view = ResearchProgressView(tab1, tab2, tab3)
+    kinds = set()
+    for _, event in queue.events(job_id):
+        kinds.add(event.kind)
+        view.handle(event)
+    if job.partial_report and "report_completed" not in kinds:
+        view.on_report_delta(job.partial_report)
+
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
+
+
+async def run_research(pipeline: ResearchPipeline, query: str, run_id: Optional[str] = None):
+    """Run the whole pipeline on one event loop, releasing pooled clients afterwards"""
+    try:
+        return await pipeline.run(query, run_id=run_id)
+    finally:
+        await pipeline.aclose()
 
 
 def initialize_session_state():
@@ -180,6 +334,13 @@ def initialize_session_state():
         st.session_state.search_results = None
     if 'report' not in st.session_state:
         st.session_state.report = None
+    if 'run_metrics' not in st.session_state:
+        st.session_state.run_metrics = None
+    if 'failed_run' not in st.session_state:
+        st.session_state.failed_run = None
+    if 'job_id' not in st.session_state:
+        # A job can be followed from a link to ?job=<id>
+        st.session_state.job_id = st.query_params.get("job")
 
 
 def check_api_keys():
@@ -258,6 +419,23 @@ def main():
 
         st.markdown("---")
 
+        st.header("Report Settings")
+        write_mode = st.radio(
+            "Report writing mode",
+            ["single", "sections"],
+            format_func=lambda mode: "Single pass" if mode == "single" else "Parallel sections (faster)",
+            help="Parallel sections outlines the report first and drafts every section at the same time"
+        )
+        fast_mode = st.checkbox(
+            "Fast mode",
+            help="Summarize lower-priority searches locally instead of running a search agent for each"
+        )
+        fast_threshold = st.slider(
+            "Use agents only for searches with priority of at least", 1, 10, 7, disabled=not fast_mode
+        )
+
+        st.markdown("---")
+
         # About section
         st.header("About")
         st.markdown("""
@@ -269,6 +447,15 @@ def main():
         4. **Writer Agent**: Synthesizes findings into a comprehensive report
         """)
 
+        with st.expander("Server Stats"):
+            for flight in (search_flight, agent_flight):
+                stats = flight.stats()
+                st.markdown(f"**{flight.name}**: {stats['coalesced']} of {stats['calls']} calls coalesced")
+            st.markdown(f"**Serper circuit**: {serper_breaker.state.replace('_', '-')}")
+            if get_job_queue() is not None:
+                jobs = get_job_queue().stats()
+                st.markdown(f"**Research jobs**: {jobs['queued']} queued, {jobs['running']} running")
+
     # Main interface
     query = st.text_input("Enter your research topic:", placeholder="e.g., Latest AI Agent frameworks in 2025")
 
@@ -276,114 +463,67 @@ def main():
     if not st.session_state.api_keys_set and not check_api_keys():
         st.warning("Please set your API keys in the sidebar before starting research.")
 
+    if query:
+        render_past_research(query)
+
+    failed_run_area = st.empty()
+    with failed_run_area.container():
+        resume_run_id = render_failed_run()
+
     # Start research button
     if st.button("Start Deep Research", type="primary",
-                 disabled=not (st.session_state.api_keys_set or check_api_keys())):
-        if not query:
+                 disabled=not (st.session_state.api_keys_set or check_api_keys())) or resume_run_id:
+        if not query and not resume_run_id:
             st.warning("Please enter a research topic.")
         else:
+            if resume_run_id:
+                query = st.session_state.failed_run["query"]
             st.session_state.research_completed = False
             st.session_state.search_plan = None
             st.session_state.search_results = None
             st.session_state.report = None
+            st.session_state.failed_run = None
+            failed_run_area.empty()
+
+            queue = get_job_queue()
+            if queue is not None:
+                # Worker processes run the research; this session only follows its progress
+                options = {"write_mode": write_mode, "fast_threshold": fast_threshold if fast_mode else None}
+                st.session_state.job_id = queue.submit(query, options, run_id=resume_run_id)
+                st.query_params["job"] = st.session_state.job_id
+                st.rerun()
 
             # Create tabs for the research process
             tab1, tab2, tab3, tab4 = st.tabs(["Research Plan", "Search Results", "Report", "Resources"])
 
-            with tab1:
-                st.header("Research Strategy")
-                # Run async functions using asyncio
-                search_plan, web_searches, video_searches, strategy = asyncio.run(plan_searches(query))
-                st.session_state.search_plan = search_plan
-
-                st.markdown(f"**Overall Strategy:**")
-                st.write(strategy)
-
-                st.markdown("### Planned Searches")
-
-                # Display web searches
-                st.subheader(f"Web Searches ({len(web_searches)})")
-                for i, search in enumerate(web_searches):
-                    with st.expander(f"{search.query} (Priority: {search.priority})"):
-                        st.write(f"**Reason:** {search.reason}")
-
-                # Display video searches
-                st.subheader(f"Video Searches ({len(video_searches)})")
-                for i, search in enumerate(video_searches):
-                    with st.expander(f"{search.query} (Priority: {search.priority})"):
-                        st.write(f"**Reason:** {search.reason}")
-
-            with tab2:
-                st.header("Search Results")
-                # Perform the searches
-                search_results = asyncio.run(perform_searches(st.session_state.search_plan))
-                st.session_state.search_results = search_results
-
-                # Group results by type
-                web_results = [r for r in search_results if r["type"] == "web"]
-                video_results = [r for r in search_results if r["type"] == "video"]
-
-                # Display web search results
-                st.subheader("Web Research Findings")
-                for i, res in enumerate(web_results):
-                    with st.expander(f"{res['query']} (Priority: {res['priority']})"):
-                        st.markdown(f"**Research Objective:** {res['reason']}")
-                        st.markdown("**Findings:**")
-                        st.markdown(res['result'])
-
-                # Display video search results
-                st.subheader("Video Research Findings")
-                for i, res in enumerate(video_results):
-                    with st.expander(f"{res['query']} (Priority: {res['priority']})"):
-                        st.markdown(f"**Selection Purpose:** {res['reason']}")
-                        st.markdown("**Available Content:**")
-                        st.markdown(res['result'])
-
-            with tab3:
-                st.header("Comprehensive Research Report")
-                # Generate the report
-                report = asyncio.run(write_report(query, st.session_state.search_results))
-                st.session_state.report = report
-
-                # Display report summary
-                st.subheader("Executive Summary")
-                st.markdown(report.short_summary)
-
-                # Display full report
-                st.subheader("Full Report")
-                st.markdown(report.markdown_report)
-
-                # Download button for the report
-                st.download_button(
-                    label="Download Report as Markdown",
-                    data=report.markdown_report,
-                    file_name="research_report.md",
-                    mime="text/markdown"
-                )
+            # Run the pipeline once, rendering its progress into the tabs as it goes
+            view = ResearchProgressView(tab1, tab2, tab3)
+            pipeline = ResearchPipeline(stream_report=True, write_mode=write_mode,
+                                        fast_threshold=fast_threshold if fast_mode else None,
+                                        report_store=get_report_store(),
+                                        checkpoints=get_checkpoint_store())
+            pipeline.subscribe(view.handle)
+            try:
+                result = asyncio.run(run_research(pipeline, query, resume_run_id))
+            except Exception as e:
+                # Completed stages are checkpointed under the run id, so the run can be resumed
+                st.session_state.failed_run = {
+                    "run_id": pipeline.run_id, "query": query, "error": str(e)
+                }
+                st.rerun()
+
+            save_result(result)
 
             with tab4:
-                st.header("Key Resources")
-
-                # Display key insights
-                st.subheader("Key Insights")
-                for i, insight in enumerate(st.session_state.report.key_insights, 1):
-                    st.markdown(f"{i}. {insight}")
-
-                # Display recommended videos
-                st.subheader("Recommended Videos")
-                for video in st.session_state.report.recommended_videos:
-                    with st.expander(video.title):
-                        st.markdown(f"**Creator:** {video.creator}")
-                        st.markdown(f"**Link:** [{video.title}]({video.link})")
-                        st.markdown(f"**Description:** {video.description}")
-
-                # Display follow-up questions
-                st.subheader("Further Research Questions")
-                for i, question in enumerate(st.session_state.report.follow_up_questions, 1):
-                    st.markdown(f"{i}. {question}")
+                render_resources(result.report)
+            render_run_metrics(result.metrics)
 
             st.session_state.research_completed = True
 
+    # Follow a research job running on the workers
+    elif st.session_state.job_id is not None and get_job_queue() is not None:
+        follow_job(get_job_queue(), st.session_state.job_id)
+
     # Display previous research results if available
     elif st.session_state.get('research_completed', False):
         tab1, tab2, tab3, tab4 = st.tabs(["Research Plan", "Search Results", "Report", "Resources"])
@@ -391,23 +531,7 @@ def main():
         with tab1:
             st.header("Research Strategy")
             # Extract from session state
-            search_plan = st.session_state.search_plan
-            web_searches = [s for s in search_plan if s.search_type == 'web']
-            video_searches = [s for s in search_plan if s.search_type == 'video']
-
-            st.markdown("### Planned Searches")
-
-            # Display web searches
-            st.subheader(f"Web Searches ({len(web_searches)})")
-            for i, search in enumerate(web_searches):
-                with st.expander(f"{search.query} (Priority: {search.priority})"):
-                    st.write(f"**Reason:** {search.reason}")
-
-            # Display video searches
-            st.subheader(f"Video Searches ({len(video_searches)})")
-            for i, search in enumerate(video_searches):
-                with st.expander(f"{search.query} (Priority: {search.priority})"):
-                    st.write(f"**Reason:** {search.reason}")
+            render_search_plan(st.session_state.search_plan)
 
         with tab2:
             st.header("Search Results")
@@ -420,19 +544,13 @@ def main():
 
             # Display web search results
             st.subheader("Web Research Findings")
-            for i, res in enumerate(web_results):
-                with st.expander(f"{res['query']} (Priority: {res['priority']})"):
-                    st.markdown(f"**Research Objective:** {res['reason']}")
-                    st.markdown("**Findings:**")
-                    st.markdown(res['result'])
+            for res in web_results:
+                render_search_result(res)
 
             # Display video search results
             st.subheader("Video Research Findings")
-            for i, res in enumerate(video_results):
-                with st.expander(f"{res['query']} (Priority: {res['priority']})"):
-                    st.markdown(f"**Selection Purpose:** {res['reason']}")
-                    st.markdown("**Available Content:**")
-                    st.markdown(res['result'])
+            for res in video_results:
+                render_search_result(res)
 
         with tab3:
             st.header("Comprehensive Research Report")
@@ -448,33 +566,12 @@ def main():
             st.markdown(report.markdown_report)
 
             # Download button for the report
-            st.download_button(
-                label="Download Report as Markdown",
-                data=report.markdown_report,
-                file_name="research_report.md",
-                mime="text/markdown"
-            )
+            render_download_button(report)
 
         with tab4:
-            st.header("Key Resources")
-
-            # Display key insights
-            st.subheader("Key Insights")
-            for i, insight in enumerate(st.session_state.report.key_insights, 1):
-                st.markdown(f"{i}. {insight}")
-
-            # Display recommended videos
-            st.subheader("Recommended Videos")
-            for video in st.session_state.report.recommended_videos:
-                with st.expander(video.title):
-                    st.markdown(f"**Creator:** {video.creator}")
-                    st.markdown(f"**Link:** [{video.title}]({video.link})")
-                    st.markdown(f"**Description:** {video.description}")
-
-            # Display follow-up questions
-            st.subheader("Further Research Questions")
-            for i, question in enumerate(st.session_state.report.follow_up_questions, 1):
-                st.markdown(f"{i}. {question}")
+            render_resources(st.session_state.report)
+        if st.session_state.run_metrics:
+            render_run_metrics(st.session_state.run_metrics)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+"""
+Batch mode: run the research pipeline for many queries from the command line.
+
+    python batch.py queries.jsonl --output-dir reports --concurrency 4
+
+Each line of the input file is a JSON object with a "query" and an optional
+"id". Every finished ReportData is written to <output-dir>/<id>.json; queries
+whose report already exists are skipped, so an interrupted batch can simply be
+re-run to resume it. With --reuse, a query that matches a stored report from
+an earlier run closely enough (REPORT_REUSE_THRESHOLD) is answered from the
+report store instead of being researched again. Runs are checkpointed stage by
+stage, so a query that failed part-way resumes from its last completed stage.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Initialize environment before importing modules that read their settings from it
+load_dotenv(override=True)
+
+from pipeline import ResearchPipeline, get_report_store, get_checkpoint_store
+from pipeline.engine import ResearchResult
+from pipeline.report_store import REUSE_THRESHOLD
+from tools.page_fetcher import close_page_fetcher
+from tools.serper_client import close_serper_client
+from tools.metrics import start_metrics_server
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """Read queries from a JSONL file, assigning a stable id to each"""
+    queries = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "query" not in entry:
+                raise ValueError(f"{path}:{line_number}: missing \"query\"")
+            entry.setdefault("id", query_id(entry["query"]))
+            queries.append(entry)
+    return queries
+
+
+def query_id(query: str) -> str:
+    """Derive a readable, filesystem-safe id from a query"""
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:60]
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}"
+
+
+def write_report(output_dir: str, entry: Dict[str, Any], result) -> str:
+    """Write a report atomically so a partial file is never mistaken for a finished one"""
+    path = os.path.join(output_dir, f"{entry['id']}.json")
+    with open(os.path.join(output_dir, f"{entry['id']}.metrics.json"), "w") as f:
+        json.dump(result.metrics, f, indent=2)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(result.report.model_dump_json(indent=2))
+    os.replace(tmp_path, path)
+    return path
+
+
+def find_reusable(query: str) -> Optional[ResearchResult]:
+    """Return the closest stored run for a query if it clears REUSE_THRESHOLD"""
+    store = get_report_store()
+    matches = store.find_similar(query, limit=1)
+    if not matches or matches[0].similarity < REUSE_THRESHOLD:
+        return None
+    stored = store.load(matches[0].id)
+    return ResearchResult(stored["query"], stored["plan"], stored["searches"],
+                          stored["search_results"], stored["report"], stored["metrics"])
+
+
+async def run_batch(queries: List[Dict[str, Any]], output_dir: str, concurrency: int,
+                    write_mode: str = "single", fast_threshold: Optional[int] = None,
+                    reuse: bool = False) -> Dict[str, int]:
+    """Run the pipeline for every pending query, at most `concurrency` at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"completed": 0, "reused": 0, "failed": 0}
+    store = get_report_store()
+    checkpoints = get_checkpoint_store()
+
+    async def research(entry):
+        if reuse:
+            result = await asyncio.to_thread(find_reusable, entry["query"])
+            if result is not None:
+                path = write_report(output_dir, entry, result)
+                counts["reused"] += 1
+                print(f"[reused] {entry['id']} from \"{result.query}\" -> {path}")
+                return
+
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                pipeline = ResearchPipeline(write_mode=write_mode, fast_threshold=fast_threshold,
+                                            report_store=store, checkpoints=checkpoints)
+                run_id = None
+                if checkpoints is not None:
+                    run_id = await asyncio.to_thread(checkpoints.find_incomplete, entry["query"])
+                if run_id is not None:
+                    print(f"[resuming] {entry['id']} from run {run_id}")
+                result = await pipeline.run(entry["query"], run_id=run_id)
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"[failed] {entry['id']}: {e}", file=sys.stderr)
+                return
+            path = write_report(output_dir, entry, result)
+            counts["completed"] += 1
+            print(f"[done] {entry['id']} in {time.perf_counter() - started:.0f}s -> {path}")
+
+    try:
+        await asyncio.gather(*(research(entry) for entry in queries))
+    finally:
+        # All pipelines share the loop's pooled Serper client and page fetcher
+        await close_serper_client()
+        await close_page_fetcher()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run deep research for many queries from a JSONL file.")
+    parser.add_argument("queries", help="JSONL file with one {\"query\": ..., \"id\": ...} object per line")
+    parser.add_argument("--output-dir", default="reports", help="Directory for the generated reports")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum research runs in progress at once")
+    parser.add_argument("--write-mode", choices=["single", "sections"], default="single",
+                        help="Write each report in one pass or as parallel sections")
+    parser.add_argument("--fast-threshold", type=int, default=None,
+                        help="Summarize searches below this priority locally instead of with an agent")
+    parser.add_argument("--reuse", action="store_true",
+                        help="Answer queries from similar stored reports instead of researching them again")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if os.environ.get("METRICS_PORT"):
+        start_metrics_server(int(os.environ["METRICS_PORT"]))
+
+    queries = load_queries(args.queries)
+    pending = [q for q in queries if not os.path.exists(os.path.join(args.output_dir, f"{q['id']}.json"))]
+    print(f"{len(queries)} queries, {len(queries) - len(pending)} already complete, {len(pending)} to run")
+
+    started = time.perf_counter()
+    counts = asyncio.run(run_batch(pending, args.output_dir, args.concurrency, args.write_mode,
+                                     args.fast_threshold, args.reuse))
+    elapsed = time.perf_counter() - started
+
+    throughput = counts["completed"] / (elapsed / 3600) if elapsed > 0 else 0.0
+    print(f"Completed {counts['completed']}, reused {counts['reused']}, failed {counts['failed']} in {elapsed:.0f}s "
+          f"({throughput:.1f} reports/hour)")
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Offline benchmarking tools: a Serper stand-in server and an end-to-end pipeline benchmark
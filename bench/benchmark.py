@@ -0,0 +1,146 @@
+"""
+End-to-end pipeline benchmark against recorded Serper and model responses.
+
+Record a cassette once with real API keys:
+
+    python -m bench.benchmark --record --cassette bench/cassette.jsonl
+
+then benchmark offline, as often as needed:
+
+    python -m bench.benchmark --cassette bench/cassette.jsonl --latency-scale 1 \
+        --output bench/results.json --baseline bench/baseline.json
+
+Replays use the recorded latency of every call (scaled by --latency-scale), so
+the timings reflect the orchestration in the pipeline rather than the network.
+With --baseline the run fails if total wall time or any stage regresses by more
+than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+from batch import load_queries
+from pipeline import ResearchPipeline
+from tools.serper_client import close_serper_client
+
+STAGES = {
+    "plan": ("plan_started", "plan_completed"),
+    "search": ("searches_started", "searches_completed"),
+    "first_result": ("searches_started", "search_completed"),
+    "write": ("report_started", "report_completed"),
+}
+
+
+async def benchmark_query(query: str, **pipeline_options) -> Dict[str, float]:
+    """Run the pipeline for one query and return per-stage latencies in seconds"""
+    timestamps: Dict[str, float] = {}
+
+    def record(event):
+        # Keep the first occurrence so "search_completed" marks time to first result
+        timestamps.setdefault(event.kind, time.perf_counter())
+
+    pipeline = ResearchPipeline(**pipeline_options)
+    pipeline.subscribe(record)
+    started = time.perf_counter()
+    await pipeline.run(query)
+    timings = {"total": time.perf_counter() - started}
+    for stage, (start, end) in STAGES.items():
+        if start in timestamps and end in timestamps:
+            timings[stage] = timestamps[end] - timestamps[start]
+    return timings
+
+
+async def run_benchmark(queries: List[Dict[str, Any]], concurrency: int, **pipeline_options) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    per_query = {}
+
+    async def run(entry):
+        async with semaphore:
+            per_query[entry["id"]] = await benchmark_query(entry["query"], **pipeline_options)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run(entry) for entry in queries))
+    finally:
+        await close_serper_client()
+    wall_time = time.perf_counter() - started
+
+    stages = sorted({stage for timings in per_query.values() for stage in timings})
+    summary = {
+        stage: statistics.median(t[stage] for t in per_query.values() if stage in t)
+        for stage in stages
+    }
+    return {"wall_time": wall_time, "median": summary, "queries": per_query}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed beyond tolerance"""
+    regressions = []
+    current = {"wall_time": results["wall_time"], **results["median"]}
+    previous = {"wall_time": baseline["wall_time"], **baseline["median"]}
+    for metric, before in previous.items():
+        after = current.get(metric)
+        if after is not None and before > 0 and after > before * (1 + tolerance):
+            regressions.append(f"{metric}: {before:.2f}s -> {after:.2f}s (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the research pipeline offline from a cassette.")
+    parser.add_argument("--queries", default=os.path.join("bench", "queries.jsonl"))
+    parser.add_argument("--cassette", default=os.path.join("bench", "cassette.jsonl"))
+    parser.add_argument("--record", action="store_true", help="Call the real APIs and record a new cassette")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for recorded latencies during replay (0 replays instantly)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Queries benchmarked at once")
+    parser.add_argument("--write-mode", choices=["single", "sections"], default="single")
+    parser.add_argument("--fast-threshold", type=int, default=None)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.record and os.path.exists(args.cassette):
+        os.remove(args.cassette)
+    # The cassette and caches read their settings from the environment on first use
+    os.environ["CASSETTE_MODE"] = "record" if args.record else "replay"
+    os.environ["CASSETTE_PATH"] = args.cassette
+    os.environ["CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    os.environ["SEARCH_CACHE_ENABLED"] = "0"
+    os.environ["PLAN_CACHE_ENABLED"] = "0"
+    # Cassettes do not record fetched pages
+    os.environ["PAGE_FETCH_ENABLED"] = "0"
+
+    queries = load_queries(args.queries)
+    results = asyncio.run(run_benchmark(
+        queries, args.concurrency, write_mode=args.write_mode, fast_threshold=args.fast_threshold
+    ))
+
+    print(f"{'query':<32}" + "".join(f"{stage:>14}" for stage in results["median"]))
+    for query_id, timings in results["queries"].items():
+        print(f"{query_id[:31]:<32}" + "".join(f"{timings.get(stage, 0):>13.2f}s" for stage in results["median"]))
+    print(f"{'median':<32}" + "".join(f"{value:>13.2f}s" for value in results["median"].values()))
+    print(f"Total wall time: {results['wall_time']:.2f}s for {len(queries)} queries")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
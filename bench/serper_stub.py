@@ -0,0 +1,148 @@
+"""
+Local stand-in for the Serper API.
+
+    python -m bench.serper_stub --cassette .cache/cassette.jsonl --port 8765
+    SERPER_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Searches recorded in the cassette are answered with their recorded response
+(and latency, scaled by --latency-scale); anything else gets deterministic
+synthetic results, so the client and pipeline can be exercised without a
+Serper account. With --serve-pages, synthetic web results link to pages
+served by the stub itself (with ETags), for exercising the page fetcher.
+"""
+import argparse
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from tools.cassette import Cassette
+from tools.search_cache import SearchCache
+
+
+def synthetic_response(query: str, search_type: str, num: int,
+                       page_base: Optional[str] = None) -> Dict[str, Any]:
+    """Deterministic fake Serper results for a query, linking to page_base/pages/... when given"""
+    seed = hashlib.sha1(f"{search_type}:{query}".encode("utf-8")).hexdigest()
+    if search_type == "video":
+        return {"videos": [
+            {
+                "title": f"{query} explained (part {i + 1})",
+                "link": f"https://www.youtube.com/watch?v={seed[i:i + 11]}",
+                "channel": f"Channel {seed[i]}",
+                "duration": f"{5 + i * 3}:{i * 7 % 60:02d}",
+                "date": f"{i + 1} weeks ago",
+                "snippet": f"An in-depth look at {query}, covering the key ideas step by step.",
+            }
+            for i in range(num)
+        ]}
+    return {"organic": [
+        {
+            "title": f"{query}: overview {i + 1}",
+            "link": f"{page_base}/pages/{seed[i:i + 8]}" if page_base
+                    else f"https://example-{seed[i]}.com/{seed[i:i + 8]}",
+            "snippet": f"This article discusses {query} in detail. It covers background, current practice "
+                       f"and open problems, with examples from source {i + 1}.",
+            "position": i + 1,
+        }
+        for i in range(num)
+    ]}
+
+
+def synthetic_page(page_id: str) -> str:
+    """A deterministic HTML article with navigation and boilerplate around it"""
+    paragraphs = "".join(
+        f"<p>Paragraph {i + 1} of article {page_id} explains one aspect of the topic in some detail, "
+        f"with enough words to read as prose rather than a menu item.</p>"
+        for i in range(20)
+    )
+    return (f"<html><head><title>Article {page_id}</title><script>var x = 1;</script></head>"
+            f"<body><nav><a href='/'>Home</a> <a href='/about'>About</a></nav>"
+            f"<article><h1>Article {page_id}</h1>{paragraphs}</article>"
+            f"<footer>Copyright notice and links</footer></body></html>")
+
+
+def make_handler(responses: Dict[str, Dict[str, Any]], latency_scale: float, serve_pages: bool = False):
+    class SerperStubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if not serve_pages or not self.path.startswith("/pages/"):
+                self.send_error(404)
+                return
+            page_id = self.path[len("/pages/"):]
+            etag = f'"{page_id}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            payload = synthetic_page(page_id).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/search":
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            # A batch request is an array of searches, answered with an array of results
+            if isinstance(body, list):
+                answers = [self.answer(search) for search in body]
+                time.sleep(max((latency for latency, _ in answers), default=0.0))
+                response = [result for _, result in answers]
+            else:
+                latency, response = self.answer(body)
+                time.sleep(latency)
+
+            payload = json.dumps(response).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def answer(self, search: Dict[str, Any]):
+            """Return the (latency, response) for one search"""
+            search_type = "video" if search.get("type") == "videos" else "web"
+            num = int(search.get("num", 10))
+            recorded = responses.get(SearchCache.make_key(search["q"], search_type, num))
+            if recorded is not None:
+                return recorded["latency"] * latency_scale, recorded["response"]
+            page_base = f"http://{self.headers.get('Host')}" if serve_pages else None
+            return 0.0, synthetic_response(search["q"], search_type, num, page_base)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SerperStubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Serper responses from a cassette or synthetic data.")
+    parser.add_argument("--cassette", help="Cassette recorded with CASSETTE_MODE=record")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for recorded latencies (0 answers immediately)")
+    parser.add_argument("--serve-pages", action="store_true",
+                        help="Link synthetic web results to HTML pages served by the stub")
+    args = parser.parse_args()
+
+    responses = {}
+    if args.cassette:
+        responses = {e["key"]: e for e in Cassette(args.cassette, "replay").entries("serper")}
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(responses, args.latency_scale, args.serve_pages))
+    print(f"Serper stand-in listening on http://{args.host}:{args.port} ({len(responses)} recorded searches)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
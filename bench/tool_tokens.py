@@ -0,0 +1,100 @@
+"""
+Token cost of search tool output, in the labelled text and compact formats.
+
+    python -m bench.tool_tokens --cassette bench/cassette.jsonl
+
+Formats every Serper response recorded in the cassette (or, without one,
+synthetic responses for the benchmark queries) the way search_tool and
+video_search_tool hand them to their agents, and reports the tokens per call
+in each format. Web results get synthetic page text for their top
+PAGE_FETCH_TOP links, as page fetching would add (--no-pages to leave it out).
+With --content-chars, the saving from also cutting that page text is reported
+separately from the saving of the format itself.
+"""
+import argparse
+import os
+import statistics
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from batch import load_queries
+from bench.serper_stub import synthetic_page, synthetic_response
+from tools.cassette import Cassette
+from tools.page_fetcher import PAGE_FETCH_TOP, html_to_text
+from tools.search_tools import format_video_results, format_web_results
+from tools.tokens import estimate_tokens
+
+
+def recorded_responses(cassette_path: str, queries_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """(search type, Serper response) pairs from a cassette, or synthetic ones for the queries"""
+    if cassette_path and os.path.exists(cassette_path):
+        return [
+            ("video" if "videos" in entry["response"] else "web", entry["response"])
+            for entry in Cassette(cassette_path, "replay").entries("serper")
+        ]
+    responses = []
+    for entry in load_queries(queries_path):
+        responses.append(("web", synthetic_response(entry["query"], "web", 10)))
+        responses.append(("video", synthetic_response(entry["query"], "video", 10)))
+    return responses
+
+
+def measure(responses: List[Tuple[str, Dict[str, Any]]], pages: bool = True,
+            content_chars: int = 0) -> Dict[str, Dict[str, float]]:
+    """Median tokens per call for each search type and format
+
+    With content_chars, web results are also measured in the compact format
+    with page text cut to that many characters ("trimmed").
+    """
+    today = date.today()
+    tokens: Dict[str, Dict[str, List[int]]] = {}
+    for search_type, data in responses:
+        page_text = {}
+        if search_type == "web" and pages:
+            links = [r["link"] for r in data.get("organic", [])[:PAGE_FETCH_TOP] if r.get("link")]
+            page_text = {link: html_to_text(synthetic_page(link.rsplit("/", 1)[-1])) for link in links}
+        outputs = {}
+        if search_type == "video":
+            for fmt in ("text", "compact"):
+                outputs[fmt] = format_video_results(data, top_result_to_return=8, today=today,
+                                                    compact=fmt == "compact")
+        else:
+            outputs["text"] = format_web_results(data, top_result_to_return=10, pages=page_text, compact=False)
+            outputs["compact"] = format_web_results(data, top_result_to_return=10, pages=page_text,
+                                                    compact=True, content_chars=0)
+            if content_chars > 0:
+                outputs["trimmed"] = format_web_results(data, top_result_to_return=10, pages=page_text,
+                                                        compact=True, content_chars=content_chars)
+        for fmt, output in outputs.items():
+            tokens.setdefault(search_type, {}).setdefault(fmt, []).append(estimate_tokens(output))
+    return {
+        search_type: {fmt: statistics.median(values) for fmt, values in formats.items()}
+        for search_type, formats in tokens.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare search tool output tokens per format.")
+    parser.add_argument("--cassette", default=os.path.join("bench", "cassette.jsonl"))
+    parser.add_argument("--queries", default=os.path.join("bench", "queries.jsonl"))
+    parser.add_argument("--no-pages", action="store_true", help="Measure snippets only, without page text")
+    parser.add_argument("--content-chars", type=int, default=0,
+                        help="Also measure web results with page text cut to this many characters")
+    args = parser.parse_args()
+
+    results = measure(recorded_responses(args.cassette, args.queries), pages=not args.no_pages,
+                      content_chars=args.content_chars)
+    # "saved" is what the compact format saves; "cut saved" what trimming page text saves on top
+    header = f"{'tool':<8}{'text':>10}{'compact':>10}{'saved':>10}"
+    print(header + (f"{'trimmed':>10}{'cut saved':>11}" if args.content_chars > 0 else ""))
+    for search_type, formats in sorted(results.items()):
+        saved = 1 - formats["compact"] / formats["text"] if formats["text"] else 0.0
+        line = f"{search_type:<8}{formats['text']:>10.0f}{formats['compact']:>10.0f}{saved:>10.0%}"
+        if "trimmed" in formats:
+            cut = 1 - formats["trimmed"] / formats["compact"] if formats["compact"] else 0.0
+            line += f"{formats['trimmed']:>10.0f}{cut:>11.0%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 # Import schemas to make them available from the package
-from .schemas import WebSearchItem, WebSearchPlan, RecommendedVideo, ReportData
+from .schemas import (WebSearchItem, WebSearchPlan, RecommendedVideo, ReportData,
+                      ReportSection, ReportOutline, ReportExtras)
 
-__all__ = ['WebSearchItem', 'WebSearchPlan', 'RecommendedVideo', 'ReportData']
\ No newline at end of file
+__all__ = ['WebSearchItem', 'WebSearchPlan', 'RecommendedVideo', 'ReportData',
+           'ReportSection', 'ReportOutline', 'ReportExtras']
\ No newline at end of file
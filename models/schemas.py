@@ -50,5 +50,35 @@ class ReportData(BaseModel):
     follow_up_questions: list[str]
     """Suggested topics to research further."""
 
+    key_insights: list[str]
+    """List of the most important takeaways from the research."""
+
+
+class ReportSection(BaseModel):
+    title: str
+    """Heading of this section of the report."""
+
+    focus: str
+    """What this section should cover, in one or two sentences."""
+
+
+class ReportOutline(BaseModel):
+    title: str
+    """Title of the full report."""
+
+    sections: list[ReportSection]
+    """The sections of the report, in reading order."""
+
+
+class ReportExtras(BaseModel):
+    short_summary: str
+    """A short 2-3 sentence summary of the findings."""
+
+    recommended_videos: list[RecommendedVideo]
+    """List of recommended videos with complete details."""
+
+    follow_up_questions: list[str]
+    """Suggested topics to research further."""
+
     key_insights: list[str]
     """List of the most important takeaways from the research."""
\ No newline at end of file
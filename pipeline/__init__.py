@@ -0,0 +1,15 @@
+# Import pipeline components to make them available from the package
+from .scheduler import PriorityScheduler
+from .streaming import StreamingFieldExtractor
+from .brief import ResearchBrief
+from .engine import ResearchPipeline, PipelineEvent, ResearchResult, SearchesFailedError
+from .checkpoints import CheckpointStore, RunCheckpoint, get_checkpoint_store
+from .report_store import ReportStore, StoredReport, get_report_store
+from .plan_cache import PlanCache, get_plan_cache
+from .jobs import Job, JobQueue, get_job_queue
+
+__all__ = ['PriorityScheduler', 'StreamingFieldExtractor', 'ResearchBrief',
+           'ResearchPipeline', 'PipelineEvent', 'ResearchResult',
+           'SearchesFailedError', 'ReportStore', 'StoredReport', 'get_report_store',
+           'CheckpointStore', 'RunCheckpoint', 'get_checkpoint_store', 'PlanCache', 'get_plan_cache',
+           'Job', 'JobQueue', 'get_job_queue']
\ No newline at end of file
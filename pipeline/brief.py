@@ -0,0 +1,364 @@
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from tools.sources import SourceRegistry, cited_ids
+from tools.tokens import estimate_tokens
+from .rerank import (
+    RERANK_TOP_K, MMRSelector, PassageIndex, Vocabulary, np, relevance, rerank_available, split_passages,
+)
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("WRITER_CONTEXT_TOKENS", 24000))
+
+# Citations of registered sources before they are numbered, e.g. [S12]
+_SOURCE_MARKER = re.compile(r"\[S(\d+)\]")
+# Bracketed numbers already in search results (footnotes, a literal [S7]), which would read as citations
+_LITERAL_CITATION = re.compile(r"\[(S?\d+)\]")
+
+# Findings that would get less room than this are dropped rather than cut to a stub
+MIN_FINDING_TOKENS = 120
+
+# What every report must cover; also the default section list for sectioned writing
+RESEARCH_SCOPE = [
+    "Historical foundations and theoretical principles",
+    "Current state-of-the-art and recent developments",
+    "Technical details and mechanisms",
+    "Applications across different domains",
+    "Key players and their contributions",
+    "Challenges, limitations, and debates",
+    "Future directions and possibilities",
+]
+
+
+@dataclass
+class _Finding:
+    res: Dict[str, Any]
+    header_tokens: int
+    passages: List[str]
+    passage_tokens: List[int]
+    shingles: List[FrozenSet[Tuple[str, ...]]]
+    words: set
+    terms: List[Any]
+
+
+def _shingles(text: str, size: int = 5) -> FrozenSet[Tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    return frozenset(tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1)))
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"\w{3,}", text.lower()))
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text at a word boundary so it fits roughly within max_tokens"""
+    keep = int(len(text) * max_tokens / max(1, estimate_tokens(text)))
+    cut = text.rfind(" ", 0, keep)
+    return text[:cut if cut > 0 else keep].rstrip() + " ...[truncated]"
+
+
+class ResearchBrief:
+    """
+    Writer-agent brief assembled incrementally as search results arrive.
+
+    Each finding is split into passages and measured in tokens when it is
+    added, so that preparation overlaps with the searches still running.
+    Rendering packs findings into the token budget in priority order,
+    skipping near-duplicate passages and truncating or dropping the
+    lowest-priority material once the budget runs out. With reranking (the
+    default when numpy is installed), it instead selects the top passages
+    across all findings by relevance and diversity; see _rerank.
+
+    Links in the findings are replaced by numbered citations into one source
+    list, so a page cited by several searches appears once, as e.g. [3].
+    Numbers follow priority order, so they are the same in every rendering.
+    """
+
+    def __init__(self, query: str, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 duplicate_threshold: float = 0.8, rerank: Optional[bool] = None,
+                 top_k: int = RERANK_TOP_K):
+        self.query = query
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        if rerank is None:
+            rerank = os.environ.get("WRITER_RERANK", "1") != "0"
+        self.rerank = rerank and rerank_available()
+        self.top_k = top_k
+        self.stats: Dict[str, int] = {}
+        self._findings: List[_Finding] = []
+        self._vocab = Vocabulary() if self.rerank else None
+        # Links are cited as [S<registry id>] until numbered in priority order
+        self._sources = SourceRegistry()
+
+    def add(self, res: Dict[str, Any]):
+        """Add one search result to the brief"""
+        if res["type"] not in ("web", "video"):
+            return
+        text = _LITERAL_CITATION.sub(r"(\1)", str(res["result"]))
+        # Cite before splitting, so passages cut from a long paragraph keep its citations
+        passages = split_passages(self._sources.cite(text, prefix="S"))
+        self._findings.append(_Finding(
+            res=res,
+            header_tokens=estimate_tokens(f"### Source: {res['query']}\n{res['reason']}") + 20,
+            passages=passages,
+            passage_tokens=[estimate_tokens(p) for p in passages],
+            shingles=[_shingles(p) for p in passages],
+            words=_words(f"{res['query']} {res['result']}"),
+            terms=[self._vocab.ids(p) for p in passages] if self.rerank else [],
+        ))
+
+    def _is_duplicate(self, shingles: FrozenSet, seen: List[FrozenSet]) -> bool:
+        for other in seen:
+            overlap = len(shingles & other)
+            if overlap and overlap / len(shingles | other) >= self.duplicate_threshold:
+                return True
+        return False
+
+    def pack(self, token_budget: int, relevant_to: Optional[str] = None):
+        """Select the content of each finding that fits in token_budget
+
+        Findings are taken highest priority first or, when relevant_to is
+        given, by word overlap with that text and then by priority.
+        Returns (web_entries, video_entries, stats).
+        """
+        if self.rerank:
+            return self._rerank(token_budget, relevant_to)
+        available = token_budget
+        stats = {"findings": len(self._findings), "included": 0, "dropped": 0,
+                 "truncated": 0, "duplicate_passages": 0, "tokens": 0}
+        seen: List[FrozenSet] = []
+        web, video = [], []
+        numbers = self._citation_numbers()
+
+        # Results arrive in completion order; fill the budget from the highest priority down,
+        # breaking ties by query so the same results always produce the same brief
+        order = sorted(self._findings, key=lambda f: (-f.res["priority"], f.res["query"]))
+        if relevant_to is not None:
+            target = _words(relevant_to)
+            order.sort(key=lambda f: len(target & f.words), reverse=True)
+
+        for finding in order:
+            used = finding.header_tokens
+            if available - used < MIN_FINDING_TOKENS:
+                stats["dropped"] += 1
+                continue
+
+            kept = []
+            for passage, tokens, shingles in zip(finding.passages, finding.passage_tokens, finding.shingles):
+                if self._is_duplicate(shingles, seen):
+                    stats["duplicate_passages"] += 1
+                    continue
+                if used + tokens > available:
+                    room = available - used
+                    if room >= MIN_FINDING_TOKENS // 2:
+                        kept.append(_truncate(passage, room))
+                        used = available
+                    stats["truncated"] += 1
+                    break
+                kept.append(passage)
+                seen.append(shingles)
+                used += tokens
+
+            if not kept:
+                stats["dropped"] += 1
+                continue
+
+            available -= used
+            stats["included"] += 1
+            stats["tokens"] += used
+            entry = (finding.res, self._number("\n\n".join(kept), numbers))
+            (web if finding.res["type"] == "web" else video).append(entry)
+
+        return web, video, stats
+
+    def _rerank(self, token_budget: int, relevant_to: Optional[str] = None):
+        """Select the most relevant, mutually diverse passages that fit in token_budget
+
+        Passages from all findings are scored with BM25 against the query and
+        each part of the research scope (or, with relevant_to, against that
+        text and the query) and picked by maximal marginal relevance, up to
+        top_k passages. Picked passages are rendered under their finding, in
+        their original order. Returns (web_entries, video_entries, stats).
+        """
+        started = time.perf_counter()
+        stats = {"findings": len(self._findings), "included": 0, "dropped": 0, "truncated": 0,
+                 "duplicate_passages": 0, "tokens": 0, "passages": 0, "selected_passages": 0}
+        web, video = [], []
+        order = sorted(self._findings, key=lambda f: (-f.res["priority"], f.res["query"]))
+        units = [(position, i) for position, finding in enumerate(order) for i in range(len(finding.passages))]
+        stats["passages"] = len(units)
+
+        if relevant_to is None:
+            query, aspects = self.query, RESEARCH_SCOPE
+        else:
+            query, aspects = relevant_to, [self.query]
+        query_terms = self._vocab.ids(query)
+        aspect_terms = [self._vocab.ids(aspect) for aspect in aspects]
+
+        picked: Dict[int, List[int]] = {}
+        if units:
+            index = PassageIndex([order[p].terms[i] for p, i in units], len(self._vocab))
+            # Higher-priority searches win near-ties
+            priority = np.array([order[p].res["priority"] for p, _ in units], dtype=np.float64)
+            scores = relevance(index, query_terms, aspect_terms) + 0.05 * priority / 10
+            selector = MMRSelector(index, scores, pool_size=max(4 * self.top_k, 200))
+
+            available = token_budget
+            for unit, closest in selector:
+                if stats["selected_passages"] >= self.top_k or available < MIN_FINDING_TOKENS // 2:
+                    break
+                if closest >= self.duplicate_threshold:
+                    stats["duplicate_passages"] += 1
+                    continue
+                position, i = units[unit]
+                cost = order[position].passage_tokens[i]
+                if position not in picked:
+                    cost += order[position].header_tokens
+                if cost > available:
+                    continue
+                selector.accept(unit)
+                picked.setdefault(position, []).append(i)
+                available -= cost
+                stats["selected_passages"] += 1
+                stats["tokens"] += cost
+
+        numbers = self._citation_numbers()
+        for position, finding in enumerate(order):
+            if position not in picked:
+                stats["dropped"] += 1
+                continue
+            stats["included"] += 1
+            kept = [finding.passages[i] for i in sorted(picked[position])]
+            entry = (finding.res, self._number("\n\n".join(kept), numbers))
+            (web if finding.res["type"] == "web" else video).append(entry)
+
+        stats["rerank_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return web, video, stats
+
+    def _citation_numbers(self) -> Dict[int, int]:
+        """Number the cited sources by first appearance in priority order"""
+        registered = {source.id for source in self._sources.sources()}
+        numbers: Dict[int, int] = {}
+        for finding in sorted(self._findings, key=lambda f: (-f.res["priority"], f.res["query"])):
+            for passage in finding.passages:
+                for source_id in map(int, _SOURCE_MARKER.findall(passage)):
+                    if source_id in registered:
+                        numbers.setdefault(source_id, len(numbers) + 1)
+        return numbers
+
+    @staticmethod
+    def _number(text: str, numbers: Dict[int, int]) -> str:
+        """Replace [S<id>] markers with citation numbers, leaving any that are not ours as plain text"""
+        def replace(match):
+            number = numbers.get(int(match.group(1)))
+            return f"[{number}]" if number is not None else f"(S{match.group(1)})"
+        return _SOURCE_MARKER.sub(replace, text)
+
+    def render_sources(self, cited: Optional[set] = None) -> str:
+        """Compact numbered source list, optionally only the citation numbers in `cited`"""
+        by_id = {source.id: source for source in self._sources.sources()}
+        lines = []
+        for source_id, number in sorted(self._citation_numbers().items(), key=lambda item: item[1]):
+            if cited is not None and number not in cited:
+                continue
+            source = by_id[source_id]
+            lines.append(f"[{number}] {source.title + ' - ' if source.title else ''}{source.url}")
+        return "\n".join(lines)
+
+    def render(self) -> str:
+        """Build the writer input from the results added so far, within the token budget"""
+        # Budget for the full source list, although dropped findings may not need all of it
+        overhead = estimate_tokens(self._render([], [], self.render_sources()))
+        web, video, self.stats = self.pack(self.token_budget - overhead)
+        cited = cited_ids("\n".join(content for _, content in web + video))
+        return self._render(web, video, self.render_sources(cited))
+
+    def render_findings(self, token_budget: int, relevant_to: Optional[str] = None) -> str:
+        """Render just the findings most relevant to a topic, for section writers"""
+        web, video, _ = self.pack(token_budget, relevant_to)
+        parts = []
+        for res, content in web + video:
+            kind = "Web findings" if res["type"] == "web" else "Video resources"
+            parts.append(f"### {kind}: {res['query']}\n{content}\n")
+        sources = self.render_sources(cited_ids("\n".join(parts)))
+        if sources:
+            parts.append(f"### Sources\n{sources}\n")
+        return "\n".join(parts)
+
+    def queries(self) -> List[str]:
+        """The search queries whose results have been added"""
+        return sorted(f.res["query"] for f in self._findings)
+
+    def video_resources(self) -> str:
+        """Render the raw video search results, for picking recommended videos"""
+        return "\n\n".join(
+            f"### {f.res['query']}\n{f.res['result']}"
+            for f in sorted(self._findings, key=lambda f: f.res["query"]) if f.res["type"] == "video"
+        )
+
+    def _render(self, web: List[Tuple[Dict[str, Any], str]], video: List[Tuple[Dict[str, Any], str]],
+                sources: str = "") -> str:
+        query = self.query
+        divider = "-" * 50 + "\n\n"
+        scope = "\n".join(f"{i}. {item}" for i, item in enumerate(RESEARCH_SCOPE, 1))
+
+        # Create a structured overview of sources and findings
+        web_sources_summary = [
+            "\n\n## WEB SOURCES OVERVIEW:\n\n",
+            "| Search Query | Key Topics Covered |\n",
+            "|-------------|--------------------|\n",
+        ]
+        for res, _ in web:
+            topics = res["query"].replace("2023", "").strip()
+            web_sources_summary.append(f"| {res['query']} | {topics} |\n")
+
+        # Detailed web findings
+        web_text = ["\n\n## DETAILED WEB RESEARCH FINDINGS:\n\n"]
+        for i, (res, content) in enumerate(web, 1):
+            web_text.append(
+                f"### Source {i}: {res['query']}\n"
+                f"**Research Objective**: {res['reason']}\n\n"
+                f"**Findings**:\n{content}\n\n{divider}"
+            )
+
+        # Video resources
+        video_text = ["\n\n## VIDEO RESOURCES IDENTIFIED:\n\n"]
+        for i, (res, content) in enumerate(video, 1):
+            video_text.append(
+                f"### Video Source {i}: {res['query']}\n"
+                f"**Selection Purpose**: {res['reason']}\n\n"
+                f"**Available Content**:\n{content}\n\n{divider}"
+            )
+
+        return f"""# COMPREHENSIVE RESEARCH ASSIGNMENT
+
+## Primary Research Query:
+{query}
+
+## Research Scope:
+This is a request for a COMPREHENSIVE research report that must cover:
+{scope}
+
+{''.join(web_sources_summary)}
+
+{''.join(web_text)}
+
+{''.join(video_text)}
+
+## SOURCES:
+Findings cite these pages by number, e.g. [3]:
+{sources or "None."}
+
+## Report Requirements:
+1. Create an authoritative, comprehensive report (2500-3000+ words)
+2. Balance historical context with cutting-edge developments
+3. Include both foundational concepts AND technical details
+4. Cover the ENTIRE landscape of {query}
+5. Follow all formatting requirements from your instructions
+6. Use all available sources to create a definitive resource on this topic
+7. Cite sources with their [n] numbers and end with a numbered References list taken from SOURCES
+
+Remember to synthesize findings across all sources into a cohesive narrative, not just summarize individual search results.
+"""
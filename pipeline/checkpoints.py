@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from models.schemas import ReportData, WebSearchItem, WebSearchPlan
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(".cache", "checkpoints.sqlite3")
+
+# An unfinished run not updated for this long is taken to be abandoned, and may be resumed
+RUN_STALE_AFTER = float(os.environ.get("CHECKPOINT_STALE_AFTER", 900))
+
+
+def search_key(item: WebSearchItem) -> str:
+    """Identify a planned search within a run"""
+    return f"{item.search_type}:{item.query}"
+
+
+@dataclass
+class RunCheckpoint:
+    """Everything a run has completed so far, as loaded from a CheckpointStore"""
+    run_id: str
+    query: str
+    status: str
+    error: Optional[str] = None
+    plan: Optional[WebSearchPlan] = None
+    searches: List[WebSearchItem] = field(default_factory=list)
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+    report: Optional[ReportData] = None
+
+
+class CheckpointStore:
+    """
+    SQLite checkpoints of each stage of a research run.
+
+    The plan, every search result and the final report are saved under the
+    run id as soon as they complete, so a failed or interrupted run can be
+    resumed from its last completed stage and failed searches retried alone.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                plan TEXT,
+                searches TEXT,
+                report TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_query ON runs(query, updated_at);
+            CREATE TABLE IF NOT EXISTS run_searches (
+                run_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                PRIMARY KEY (run_id, key)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def start(self, run_id: str, query: str):
+        now = time.time()
+        self._execute(
+            "INSERT OR IGNORE INTO runs (run_id, query, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (run_id, query, "planning", now, now),
+        )
+
+    def set_status(self, run_id: str, status: str, error: Optional[str] = None):
+        self._execute(
+            "UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+            (status, error, time.time(), run_id),
+        )
+
+    def save_plan(self, run_id: str, plan: WebSearchPlan, searches: List[WebSearchItem]):
+        self._execute(
+            "UPDATE runs SET plan = ?, searches = ?, status = ?, updated_at = ? WHERE run_id = ?",
+            (plan.model_dump_json(), json.dumps([s.model_dump() for s in searches]),
+             "searching", time.time(), run_id),
+        )
+
+    def _save_search(self, run_id: str, item: WebSearchItem, result: Optional[str], error: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_searches (run_id, key, result, error) VALUES (?, ?, ?, ?)",
+                (run_id, search_key(item), result, error),
+            )
+            # Every finished search shows the run is still making progress
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (time.time(), run_id))
+            self._conn.commit()
+
+    def save_search(self, run_id: str, item: WebSearchItem, result: Dict[str, Any]):
+        self._save_search(run_id, item, json.dumps(result, default=str), None)
+
+    def save_search_failure(self, run_id: str, item: WebSearchItem, error: str):
+        self._save_search(run_id, item, None, error)
+
+    def save_report(self, run_id: str, report: ReportData):
+        self._execute(
+            "UPDATE runs SET report = ?, status = ?, error = NULL, updated_at = ? WHERE run_id = ?",
+            (report.model_dump_json(), "completed", time.time(), run_id),
+        )
+
+    def load(self, run_id: str) -> Optional[RunCheckpoint]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT query, status, error, plan, searches, report FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            search_rows = self._conn.execute(
+                "SELECT key, result, error FROM run_searches WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        if row is None:
+            return None
+
+        query, status, error, plan, searches, report = row
+        checkpoint = RunCheckpoint(run_id, query, status, error)
+        if plan is not None:
+            checkpoint.plan = WebSearchPlan.model_validate_json(plan)
+            checkpoint.searches = [WebSearchItem.model_validate(s) for s in json.loads(searches)]
+        for key, result, search_error in search_rows:
+            if result is not None:
+                checkpoint.results[key] = json.loads(result)
+            else:
+                checkpoint.failed[key] = search_error
+        if report is not None:
+            checkpoint.report = ReportData.model_validate_json(report)
+        return checkpoint
+
+    def find_incomplete(self, query: str, stale_after: float = RUN_STALE_AFTER) -> Optional[str]:
+        """Return the id of the most recent unfinished run for a query that can be resumed, if any
+
+        Only failed runs and runs not updated for `stale_after` seconds count,
+        so a run another process is still executing is left alone.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT run_id FROM runs WHERE query = ? AND status != 'completed'
+                   AND (status = 'failed' OR updated_at < ?)
+                   ORDER BY updated_at DESC LIMIT 1""",
+                (query, time.time() - stale_after),
+            ).fetchone()
+        return row[0] if row else None
+
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """Return the process-wide checkpoint store, or None when disabled via CHECKPOINTS_ENABLED=0"""
+    global _store
+    if os.environ.get("CHECKPOINTS_ENABLED", "1") == "0":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore(os.environ.get("CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH))
+    return _store
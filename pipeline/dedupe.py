@@ -0,0 +1,85 @@
+import os
+from typing import FrozenSet, List, Tuple
+
+from models.schemas import WebSearchItem
+from .text import content_words
+
+# Searches on the same provider whose topic words overlap at least this much are collapsed into one
+DUPLICATE_THRESHOLD = float(os.environ.get("SEARCH_DUPLICATE_THRESHOLD", 0.85))
+# A web and a video search are only collapsed when they are all but identical
+CROSS_TYPE_DUPLICATE_THRESHOLD = float(os.environ.get("SEARCH_CROSS_TYPE_DUPLICATE_THRESHOLD", 0.9))
+
+# Words that do not change what a search finds, besides the usual stopwords
+FRESHNESS_WORDS = frozenset({"latest", "new", "recent"})
+
+
+def _stem(word: str) -> str:
+    """Strip plural endings so "batteries" and "battery" compare equal"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _terms(query: str) -> FrozenSet[str]:
+    """The query's topic words, so word order and plurals do not matter"""
+    return frozenset(_stem(w) for w in content_words(query) if w not in FRESHNESS_WORDS)
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def query_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of two search queries' topic words (0-1)"""
+    return _jaccard(_terms(a), _terms(b))
+
+
+def _is_duplicate(a: FrozenSet[str], b: FrozenSet[str], threshold: float) -> bool:
+    """Whether two searches' topic words are close enough to merge them
+
+    Searches that each have a topic word the other lacks ("... case study" and
+    "... challenges") cover different angles and are never merged.
+    """
+    if (a - b) and (b - a):
+        return False
+    return _jaccard(a, b) >= threshold
+
+
+def collapse_duplicate_searches(
+    searches: List[WebSearchItem],
+    threshold: float = DUPLICATE_THRESHOLD,
+    cross_type_threshold: float = CROSS_TYPE_DUPLICATE_THRESHOLD,
+) -> Tuple[List[WebSearchItem], List[Tuple[WebSearchItem, WebSearchItem]]]:
+    """Merge near-duplicate planned searches
+
+    Searches are visited highest priority first; one that is near-identical to
+    an already kept search is dropped and its reason merged into the kept one,
+    which keeps the higher priority. Returns the kept searches (highest
+    priority first) and (dropped, kept) pairs describing every merge.
+    """
+    kept: List[WebSearchItem] = []
+    terms: List[FrozenSet[str]] = []
+    merged: List[Tuple[WebSearchItem, int]] = []
+
+    for item in sorted(searches, key=lambda s: s.priority, reverse=True):
+        item_terms = _terms(item.query)
+        match = None
+        for i, other in enumerate(kept):
+            limit = threshold if other.search_type == item.search_type else cross_type_threshold
+            if _is_duplicate(item_terms, terms[i], limit):
+                match = i
+                break
+
+        if match is None:
+            kept.append(item)
+            terms.append(item_terms)
+            continue
+
+        other = kept[match]
+        reason = other.reason if item.reason in other.reason else f"{other.reason} Also: {item.reason}"
+        kept[match] = other.model_copy(update={"reason": reason, "priority": max(other.priority, item.priority)})
+        merged.append((item, match))
+
+    return kept, [(item, kept[i]) for item, i in merged]
@@ -0,0 +1,348 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from agents import trace, gen_trace_id
+
+from models.schemas import WebSearchItem, WebSearchPlan, ReportData
+from tools.resilience import CircuitOpenError
+from tools.search_tools import format_video_results, unavailable_message
+from tools.page_fetcher import close_page_fetcher
+from tools.serper_client import close_serper_client, get_serper_client
+from tools.metrics import RunMetrics, current_run, metrics, timed_stage
+from tools.sources import SourceRegistry, current_sources
+from workers import planner_agent, web_search_agent, video_search_agent, writer_agent
+from .brief import ResearchBrief
+from .checkpoints import CheckpointStore, search_key
+from .dedupe import collapse_duplicate_searches
+from .plan_cache import get_plan_cache
+from .runner import run_agent, run_agent_streamed, run_search_agent
+from .scheduler import PriorityScheduler
+from .sections import write_report_by_sections
+from .summarizer import summarize_results
+from .report_store import ReportStore
+
+
+@dataclass
+class PipelineEvent:
+    """A progress notification emitted by ResearchPipeline.
+
+    kind is one of: plan_started, plan_completed, searches_merged, searches_started,
+    search_completed, search_failed, search_dropped, searches_completed,
+    report_started, report_delta, report_completed.
+    """
+    kind: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+class SearchesFailedError(RuntimeError):
+    """Raised after the search stage when some searches failed; the rest completed"""
+
+    def __init__(self, failed: List[Tuple[WebSearchItem, Exception]]):
+        self.failed = failed
+        details = "; ".join(f"{item.query}: {error}" for item, error in failed)
+        super().__init__(f"{len(failed)} searches failed ({details})")
+
+
+@dataclass
+class ResearchResult:
+    query: str
+    plan: WebSearchPlan
+    searches: List[WebSearchItem]
+    search_results: List[Dict[str, Any]]
+    report: ReportData
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+class ResearchPipeline:
+    """
+    Headless plan -> search -> write research engine.
+
+    A full run happens on a single event loop so pooled clients are reused
+    across stages. Progress is reported to subscribers as PipelineEvents,
+    which lets the Streamlit UI (or any other front end) render it.
+
+    write_mode is "single" (one writer agent call) or "sections" (outline,
+    parallel section drafts, then a finishing pass). When fast_threshold is
+    set, searches with a lower priority skip their agent and are summarized
+    locally from the raw Serper results. Finished runs are saved to
+    report_store when one is given.
+
+    With allow_partial (the default, ALLOW_PARTIAL_RESULTS), failed searches
+    are reported and the report is written from the rest; otherwise the run
+    stops with SearchesFailedError so the failed searches can be retried.
+
+    With a CheckpointStore, the plan, each search result and the report are
+    checkpointed under the run id (self.run_id) as they complete, and
+    run(query, run_id=...) resumes a failed run: completed stages and searches
+    are restored rather than repeated, so only the failed work is retried.
+    """
+
+    def __init__(self, stream_report: bool = False,
+                 scheduler_factory: Callable[[], PriorityScheduler] = PriorityScheduler.from_env,
+                 write_mode: Optional[str] = None, fast_threshold: Optional[int] = None,
+                 report_store: Optional[ReportStore] = None,
+                 checkpoints: Optional[CheckpointStore] = None,
+                 allow_partial: Optional[bool] = None):
+        self.stream_report = stream_report
+        self.write_mode = write_mode or os.environ.get("REPORT_WRITE_MODE", "single")
+        if fast_threshold is None and os.environ.get("FAST_MODE_THRESHOLD"):
+            fast_threshold = int(os.environ["FAST_MODE_THRESHOLD"])
+        self.fast_threshold = fast_threshold
+        self.report_store = report_store
+        self.checkpoints = checkpoints
+        if allow_partial is None:
+            allow_partial = os.environ.get("ALLOW_PARTIAL_RESULTS", "1") != "0"
+        self.allow_partial = allow_partial
+        self.run_id: Optional[str] = None
+        self.scheduler_factory = scheduler_factory
+        self._subscribers: List[Callable[[PipelineEvent], None]] = []
+
+    def subscribe(self, callback: Callable[[PipelineEvent], None]):
+        """Register a callback that receives every PipelineEvent"""
+        self._subscribers.append(callback)
+
+    def emit(self, kind: str, **data):
+        event = PipelineEvent(kind, data)
+        for callback in self._subscribers:
+            callback(event)
+
+    async def plan(self, query: str):
+        """Use the planner_agent to plan which searches to run, sorted by priority (highest first)
+
+        Plans are reused from the plan cache for repeated or closely similar
+        queries, and near-duplicate searches are merged before they are run.
+        """
+        self.emit("plan_started", query=query)
+        cache = get_plan_cache()
+        with timed_stage("plan"):
+            plan = await asyncio.to_thread(cache.get, query) if cache is not None else None
+            cached = plan is not None
+            if not cached:
+                result = await run_agent(planner_agent, f"query: {query}")
+                plan = result.final_output
+                if cache is not None:
+                    await asyncio.to_thread(cache.set, query, plan)
+
+        searches, merged = collapse_duplicate_searches(plan.searches)
+        self.emit("plan_completed", plan=plan, searches=searches, cached=cached)
+        if merged:
+            metrics.inc("searches_merged_total", len(merged))
+            self.emit("searches_merged", merged=merged)
+        return plan, searches
+
+    async def perform_search(self, item: WebSearchItem) -> Dict[str, Any]:
+        """Run a single web or video search through its agent, or locally in fast mode"""
+        started = time.perf_counter()
+        if item.search_type == 'video':
+            agent, default_priority = video_search_agent, 6
+        else:
+            agent, default_priority = web_search_agent, 5
+        priority = getattr(item, 'priority', default_priority)
+
+        with timed_stage(f"{item.search_type}_search", name=item.query):
+            if self.fast_threshold is not None and priority < self.fast_threshold:
+                output, mode = await self.perform_fast_search(item), "fast"
+            else:
+                input_text = f"search query: {item.query}\nreason for searching: {item.reason}"
+                result = await run_search_agent(agent, item, input_text)
+                output, mode = result.final_output, "agent"
+
+        return {
+            "type": item.search_type,
+            "query": item.query,
+            "reason": item.reason,
+            "priority": priority,
+            "result": output,
+            "mode": mode,
+            "elapsed": time.perf_counter() - started,
+        }
+
+    async def perform_fast_search(self, item: WebSearchItem) -> str:
+        """Fetch Serper results directly and condense them without a model call
+
+        A failed Serper request is reported in the result text, as the search
+        tools do, rather than raised.
+        """
+        try:
+            data = await get_serper_client().search(item.query, item.search_type)
+        except (CircuitOpenError, httpx.HTTPError) as e:
+            return unavailable_message("Video search" if item.search_type == 'video' else "Web search", e)
+        if item.search_type == 'video':
+            # The writer reads this directly, so keep the labelled blocks, one passage per video
+            return format_video_results(data, compact=False)
+        return summarize_results(item.query, item.reason, data.get('organic', [])[:10])
+
+    async def _checkpointed_search(self, item: WebSearchItem):
+        """Run one search, checkpointing its result, or returning the exception if it failed"""
+        try:
+            res = await self.perform_search(item)
+        except Exception as e:
+            await self._checkpoint("save_search_failure", item, f"{type(e).__name__}: {e}")
+            return e
+        await self._checkpoint("save_search", item, res)
+        return res
+
+    async def search(self, searches: List[WebSearchItem], brief: Optional[ResearchBrief] = None,
+                     completed: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Execute the planned searches concurrently, highest priority first
+
+        Each result is emitted as it completes and, when a brief is given,
+        added to it straight away so writer preparation overlaps the searches
+        still running. Searches found in `completed` (keyed by search_key) are
+        restored instead of run again. A failed search does not stop the
+        others; once they have all finished, SearchesFailedError is raised
+        unless partial results are allowed and at least one search succeeded.
+        """
+        completed = completed or {}
+        scheduler = self.scheduler_factory()
+        self.emit("searches_started", total=len(searches), max_concurrency=scheduler.max_concurrency)
+
+        results, failed = [], []
+        remaining = []
+        for item in searches:
+            res = completed.get(search_key(item))
+            if res is None:
+                remaining.append(item)
+                continue
+            results.append(res)
+            if brief is not None:
+                brief.add(res)
+            self.emit("search_completed", result=res)
+
+        with timed_stage("search"):
+            async for item, res in scheduler.stream(remaining, self._checkpointed_search):
+                if isinstance(res, Exception):
+                    failed.append((item, res))
+                    self.emit("search_failed", item=item, error=str(res))
+                    continue
+                results.append(res)
+                if brief is not None:
+                    brief.add(res)
+                self.emit("search_completed", result=res)
+
+        for item in scheduler.dropped:
+            self.emit("search_dropped", item=item)
+
+        # Keep the highest-priority findings first for the report
+        results.sort(key=lambda r: (-r["priority"], r["query"]))
+        self.emit("searches_completed", results=results, total=len(searches))
+        if failed and (not self.allow_partial or not results):
+            raise SearchesFailedError(failed)
+        return results
+
+    async def write(self, query: str, search_results: List[Dict[str, Any]],
+                    brief: Optional[ResearchBrief] = None) -> ReportData:
+        """Use the writer agent to write a comprehensive deep research report"""
+        with timed_stage("write"):
+            return await self._write(query, search_results, brief)
+
+    async def _write(self, query: str, search_results: List[Dict[str, Any]],
+                     brief: Optional[ResearchBrief]) -> ReportData:
+        if brief is None:
+            brief = ResearchBrief(query)
+            for res in search_results:
+                brief.add(res)
+
+        if self.write_mode == "sections":
+            self.emit("report_started", query=query, context=None)
+            report = await write_report_by_sections(
+                query, brief, on_progress=lambda text: self.emit("report_delta", text=text)
+            )
+            self.emit("report_completed", report=report)
+            return report
+
+        input_text = brief.render()
+        self.emit("report_started", query=query, context=brief.stats)
+        if self.stream_report:
+            result = await run_agent_streamed(
+                writer_agent, input_text, "markdown_report",
+                lambda text: self.emit("report_delta", text=text)
+            )
+        else:
+            result = await run_agent(writer_agent, input_text)
+
+        report = result.final_output
+        self.emit("report_completed", report=report)
+        return report
+
+    async def _checkpoint(self, method: str, *args):
+        if self.checkpoints is not None and self.run_id is not None:
+            await asyncio.to_thread(getattr(self.checkpoints, method), self.run_id, *args)
+
+    async def run(self, query: str, run_id: Optional[str] = None) -> ResearchResult:
+        """Run the full plan -> search -> write pipeline for a query
+
+        The run is traced in the agents SDK under one trace id, which is also
+        the id of the run's metrics summary (written to METRICS_DIR when set).
+        A new run is checkpointed under the same id; pass the id of an earlier
+        run as run_id to resume it (the stored query is used).
+        """
+        checkpoint = None
+        if run_id is not None:
+            if self.checkpoints is None:
+                raise ValueError("Resuming a run requires a checkpoint store")
+            checkpoint = await asyncio.to_thread(self.checkpoints.load, run_id)
+            if checkpoint is None:
+                raise KeyError(f"No checkpoint for run {run_id}")
+            query = checkpoint.query
+
+        trace_id = gen_trace_id()
+        self.run_id = run_id or trace_id
+        if checkpoint is None and self.checkpoints is not None:
+            await asyncio.to_thread(self.checkpoints.start, self.run_id, query)
+
+        run_metrics = RunMetrics(trace_id, query)
+        token = current_run.set(run_metrics)
+        # Search tools share one registry per run to skip pages another search already returned
+        sources_token = current_sources.set(SourceRegistry())
+        try:
+            # Attempts at the same run share a group id in the trace viewer
+            with trace("Deep research", trace_id=trace_id, group_id=self.run_id), timed_stage("total"):
+                if checkpoint is not None and checkpoint.plan is not None:
+                    plan, searches = checkpoint.plan, checkpoint.searches
+                    self.emit("plan_started", query=query)
+                    self.emit("plan_completed", plan=plan, searches=searches)
+                else:
+                    plan, searches = await self.plan(query)
+                    await self._checkpoint("save_plan", plan, searches)
+
+                brief = ResearchBrief(query)
+                search_results = await self.search(
+                    searches, brief, checkpoint.results if checkpoint is not None else None
+                )
+
+                if checkpoint is not None and checkpoint.report is not None:
+                    report = checkpoint.report
+                    self.emit("report_started", query=query, context=None)
+                    self.emit("report_completed", report=report)
+                else:
+                    await self._checkpoint("set_status", "writing")
+                    report = await self.write(query, search_results, brief)
+                    await self._checkpoint("save_report", report)
+        except Exception as e:
+            await self._checkpoint("set_status", "failed", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            current_sources.reset(sources_token)
+            current_run.reset(token)
+
+        summary = run_metrics.summary()
+        metrics_dir = os.environ.get("METRICS_DIR")
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+            with open(os.path.join(metrics_dir, f"run-{trace_id}.json"), "w") as f:
+                json.dump(summary, f, indent=2)
+        result = ResearchResult(query, plan, searches, search_results, report, summary)
+        if self.report_store is not None:
+            await asyncio.to_thread(self.report_store.save, result)
+        return result
+
+    async def aclose(self):
+        """Release the pooled clients bound to the running event loop"""
+        await close_serper_client()
+        await close_page_fetcher()
@@ -0,0 +1,294 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from models import schemas
+from tools.metrics import metrics
+from .engine import PipelineEvent, ResearchResult
+
+DEFAULT_JOB_QUEUE_PATH = os.path.join(".cache", "jobs.sqlite3")
+
+# A running job whose worker has not reported for this long is handed to another worker
+JOB_STALE_AFTER = float(os.environ.get("JOB_STALE_AFTER", 120))
+# Attempts at a job before it is failed rather than requeued
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+
+def encode_value(value: Any) -> Any:
+    """Make event data JSON-serializable, tagging pydantic models so they can be rebuilt"""
+    if isinstance(value, BaseModel):
+        return {"__model__": type(value).__name__, "data": value.model_dump()}
+    if isinstance(value, dict):
+        return {k: encode_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    return value
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "__model__" in value:
+            return getattr(schemas, value["__model__"]).model_validate(value["data"])
+        return {k: decode_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    return value
+
+
+@dataclass
+class Job:
+    """A research run submitted to a JobQueue, as last saved by its worker"""
+    id: str
+    query: str
+    status: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    run_id: Optional[str] = None
+    worker: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    partial_report: Optional[str] = None
+    # Set when a worker claims the job; its writes only count while it still holds the claim
+    claim: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+
+_JOB_COLUMNS = ("id, query, status, options, run_id, worker, error, attempts, "
+                "created_at, started_at, finished_at, partial_report, claim")
+
+
+class JobQueue:
+    """
+    SQLite queue of research jobs, shared by the UI and worker processes.
+
+    The UI submits a query and polls the job by id; a worker claims it, runs
+    the pipeline and appends every PipelineEvent to the job, so progress can
+    be replayed by any number of readers. The report being written is kept
+    as one continuously overwritten partial text rather than as events.
+    Workers send heartbeats; a job whose worker stops reporting is requeued,
+    with the events of the abandoned attempt cleared, and resumes from its run
+    checkpoint. Worker writes take the claimed Job and only apply while its
+    claim is current, returning False once the job has been handed to
+    another worker.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOB_QUEUE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Several processes write to the queue; wait for their locks instead of failing
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                options TEXT NOT NULL,
+                run_id TEXT,
+                worker TEXT,
+                claim TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL,
+                partial_report TEXT,
+                result TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def submit(self, query: str, options: Optional[Dict[str, Any]] = None, run_id: Optional[str] = None) -> str:
+        """Queue a research run, returning its job id; with run_id, the job resumes that run"""
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, query, status, options, run_id, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, query, "queued", json.dumps(options or {}), run_id, time.time()),
+        )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Take the oldest queued job for a worker, or return None if there is none"""
+        token = uuid.uuid4().hex
+        now = time.time()
+        # A single UPDATE is atomic across processes, so each job is claimed once
+        claimed = self._execute(
+            """UPDATE jobs SET status = 'running', worker = ?, claim = ?, started_at = ?, heartbeat_at = ?,
+                   attempts = attempts + 1
+               WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)
+                 AND status = 'queued'""",
+            (worker, token, now, now),
+        )
+        if not claimed:
+            return None
+        return self._load_where("claim = ?", (token,))
+
+    def heartbeat(self, job: Job) -> bool:
+        return self._execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND claim = ?", (time.time(), job.id, job.claim),
+        ) > 0
+
+    def set_run_id(self, job: Job, run_id: str) -> bool:
+        return self._execute("UPDATE jobs SET run_id = ? WHERE id = ? AND claim = ?", (run_id, job.id, job.claim)) > 0
+
+    def add_event(self, job: Job, event: PipelineEvent) -> bool:
+        data = json.dumps(encode_value(event.data), default=str)
+        return self._execute(
+            """INSERT INTO job_events (job_id, seq, kind, data)
+               SELECT ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?), ?, ?
+               WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND claim = ?)""",
+            (job.id, job.id, event.kind, data, job.id, job.claim),
+        ) > 0
+
+    def set_partial_report(self, job: Job, text: str) -> bool:
+        return self._execute(
+            "UPDATE jobs SET partial_report = ? WHERE id = ? AND claim = ?", (text, job.id, job.claim),
+        ) > 0
+
+    def complete(self, job: Job, result: ResearchResult) -> bool:
+        encoded = json.dumps(encode_value({
+            "query": result.query,
+            "plan": result.plan,
+            "searches": result.searches,
+            "search_results": result.search_results,
+            "report": result.report,
+            "metrics": result.metrics,
+        }), default=str)
+        return self._execute(
+            """UPDATE jobs SET status = 'completed', result = ?, error = NULL, partial_report = NULL,
+                   finished_at = ? WHERE id = ? AND claim = ?""",
+            (encoded, time.time(), job.id, job.claim),
+        ) > 0
+
+    def fail(self, job: Job, error: str) -> bool:
+        return self._execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ? AND claim = ?",
+            (error, time.time(), job.id, job.claim),
+        ) > 0
+
+    def requeue_stale(self, stale_after: float = JOB_STALE_AFTER, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """Hand running jobs whose worker stopped reporting back to the queue
+
+        Jobs that have already used max_attempts are failed instead. The
+        next attempt records its progress afresh, so the events and partial
+        report of the abandoned one are cleared. Returns the number of jobs
+        requeued.
+        """
+        cutoff = time.time() - stale_after
+        with self._lock:
+            self._conn.execute(
+                """UPDATE jobs SET status = 'failed', error = 'Worker stopped responding', finished_at = ?
+                   WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?""",
+                (time.time(), cutoff, max_attempts),
+            )
+            self._conn.execute(
+                """DELETE FROM job_events
+                   WHERE job_id IN (SELECT id FROM jobs WHERE status = 'running' AND heartbeat_at < ?)""",
+                (cutoff,),
+            )
+            requeued = self._conn.execute(
+                """UPDATE jobs SET status = 'queued', worker = NULL, claim = NULL, partial_report = NULL
+                   WHERE status = 'running' AND heartbeat_at < ?""",
+                (cutoff,),
+            ).rowcount
+            self._conn.commit()
+        return requeued
+
+    def _load_where(self, condition: str, params: tuple) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE {condition}", params).fetchone()
+        if row is None:
+            return None
+        (job_id, query, status, options, run_id, worker, error, attempts,
+         created_at, started_at, finished_at, partial_report, claim) = row
+        return Job(job_id, query, status, json.loads(options), run_id, worker, error, attempts,
+                   created_at, started_at, finished_at, partial_report, claim)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._load_where("id = ?", (job_id,))
+
+    def events(self, job_id: str, after: int = 0) -> List[Tuple[int, PipelineEvent]]:
+        """The events a job has emitted after sequence number `after`, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, kind, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [(seq, PipelineEvent(kind, decode_value(json.loads(data)))) for seq, kind, data in rows]
+
+    def result(self, job_id: str) -> Optional[ResearchResult]:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        stored = decode_value(json.loads(row[0]))
+        return ResearchResult(stored["query"], stored["plan"], stored["searches"],
+                              stored["search_results"], stored["report"], stored["metrics"])
+
+    def position(self, job_id: str) -> int:
+        """How many queued jobs are ahead of this one"""
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT COUNT(*) FROM jobs WHERE status = 'queued'
+                   AND created_at < (SELECT created_at FROM jobs WHERE id = ?)""",
+                (job_id,),
+            ).fetchone()
+        return row[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    """Return the process-wide job queue, or None unless enabled via JOB_QUEUE_ENABLED=1
+
+    The queue is off by default, as its jobs only run while worker processes
+    (python worker.py) are running.
+    """
+    global _queue
+    if os.environ.get("JOB_QUEUE_ENABLED", "0") != "1":
+        return None
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(os.environ.get("JOB_QUEUE_PATH", DEFAULT_JOB_QUEUE_PATH))
+            metrics.register_gauge("research_jobs", "Research jobs by status", _queue.stats, label="status")
+    return _queue
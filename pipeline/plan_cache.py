@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from models.schemas import WebSearchPlan
+from tools.metrics import metrics
+from tools.search_cache import normalize_query
+from .text import content_words
+
+DEFAULT_PLAN_CACHE_PATH = os.path.join(".cache", "plan_cache.sqlite3")
+
+
+# Similar-query lookups compare against at most this many of the newest cached plans
+SIMILAR_SCAN_LIMIT = 200
+
+
+def _terms(query: str) -> frozenset:
+    return frozenset(content_words(query))
+
+
+def _numbers(terms: frozenset) -> frozenset:
+    """Terms with digits (years, versions, quantities), which must match for a plan to be reused"""
+    return frozenset(t for t in terms if any(c.isdigit() for c in t))
+
+
+class PlanCache:
+    """
+    SQLite cache of planner output keyed by the normalized query.
+
+    Besides exact matches, a query whose topic words overlap a cached query's
+    by at least `similarity` (Jaccard) reuses that plan, so close variants of
+    a topic skip the planner round-trip too. Only the newest SIMILAR_SCAN_LIMIT
+    plans are compared, and queries that differ in a number ("... 2024" and
+    "... 2025") never match. A similarity of 0 disables this.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PLAN_CACHE_PATH,
+        ttl: float = 24 * 3600,
+        similarity: float = 0.8,
+        max_entries: int = 1000,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS plan_cache (
+                key TEXT PRIMARY KEY,
+                plan TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_cache_created ON plan_cache(created_at)")
+        self._conn.commit()
+
+    def get(self, query: str) -> Optional[WebSearchPlan]:
+        """Return the cached plan for this query or a close variant, or None"""
+        key = normalize_query(query)
+        oldest = time.time() - self.ttl
+        with self._lock:
+            self._conn.execute("DELETE FROM plan_cache WHERE created_at < ?", (oldest,))
+            self._conn.commit()
+            row = self._conn.execute("SELECT plan FROM plan_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                return WebSearchPlan.model_validate_json(row[0])
+
+            if self.similarity > 0:
+                terms = _terms(query)
+                best, best_score = None, 0.0
+                rows = self._conn.execute(
+                    "SELECT key, plan FROM plan_cache ORDER BY created_at DESC LIMIT ?", (SIMILAR_SCAN_LIMIT,)
+                )
+                for cached_key, plan in rows:
+                    cached_terms = _terms(cached_key)
+                    if not terms or not cached_terms or _numbers(terms) != _numbers(cached_terms):
+                        continue
+                    score = len(terms & cached_terms) / len(terms | cached_terms)
+                    if score > best_score:
+                        best, best_score = plan, score
+                if best is not None and best_score >= self.similarity:
+                    self.similar_hits += 1
+                    return WebSearchPlan.model_validate_json(best)
+
+            self.misses += 1
+        return None
+
+    def set(self, query: str, plan: WebSearchPlan):
+        """Store a plan and drop the oldest entries over the size cap"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plan_cache VALUES (?, ?, ?)",
+                (normalize_query(query), plan.model_dump_json(), time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM plan_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    """DELETE FROM plan_cache WHERE key IN (
+                        SELECT key FROM plan_cache ORDER BY created_at ASC LIMIT ?
+                    )""",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM plan_cache").fetchone()
+        return {"hits": self.hits, "similar_hits": self.similar_hits, "misses": self.misses, "entries": size}
+
+
+_cache: Optional[PlanCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """Return the process-wide plan cache, or None when disabled via PLAN_CACHE_ENABLED=0."""
+    global _cache
+    if os.environ.get("PLAN_CACHE_ENABLED", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PlanCache(
+                path=os.environ.get("PLAN_CACHE_PATH", DEFAULT_PLAN_CACHE_PATH),
+                ttl=float(os.environ.get("PLAN_CACHE_TTL", 24 * 3600)),
+                similarity=float(os.environ.get("PLAN_CACHE_SIMILARITY", 0.8)),
+                max_entries=int(os.environ.get("PLAN_CACHE_MAX_ENTRIES", 1000)),
+            )
+    return _cache
+
+
+metrics.register_gauge(
+    "plan_cache", "Plan cache hits, similar-query hits, misses and entries",
+    lambda: _cache.stats() if _cache is not None else {}
+)
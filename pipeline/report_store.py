@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from models.schemas import ReportData, WebSearchItem, WebSearchPlan
+from tools.search_cache import normalize_query
+from .text import content_words
+
+DEFAULT_STORE_PATH = os.path.join(".cache", "reports.sqlite3")
+
+# Stored reports whose query is at least this similar are offered for reuse
+REUSE_THRESHOLD = float(os.environ.get("REPORT_REUSE_THRESHOLD", 0.6))
+
+
+@dataclass
+class StoredReport:
+    id: int
+    query: str
+    created_at: float
+    short_summary: str
+    similarity: float
+
+
+def _terms(text: str) -> set:
+    return set(content_words(text))
+
+
+class ReportStore:
+    """
+    SQLite store of finished research runs with an FTS5 index for lookups.
+
+    Each run's query, plan, search results and ReportData are kept, and the
+    query, summary and key insights are full-text indexed so that a new query
+    can be matched against tens of thousands of past reports quickly.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY,
+                run_id TEXT,
+                query TEXT NOT NULL,
+                normalized_query TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                plan TEXT NOT NULL,
+                searches TEXT NOT NULL,
+                search_results TEXT NOT NULL,
+                report TEXT NOT NULL,
+                short_summary TEXT NOT NULL,
+                metrics TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_reports_normalized ON reports(normalized_query);
+            CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(query, summary, insights);
+            """
+        )
+        self._conn.commit()
+
+    def save(self, result) -> int:
+        """Persist a ResearchResult and index it, returning its id"""
+        report: ReportData = result.report
+        with self._lock:
+            cursor = self._conn.execute(
+                """INSERT INTO reports
+                   (run_id, query, normalized_query, created_at, plan, searches, search_results, report,
+                    short_summary, metrics)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    result.metrics.get("run_id"),
+                    result.query,
+                    normalize_query(result.query),
+                    time.time(),
+                    result.plan.model_dump_json(),
+                    json.dumps([s.model_dump() for s in result.searches]),
+                    json.dumps(result.search_results, default=str),
+                    report.model_dump_json(),
+                    report.short_summary,
+                    json.dumps(result.metrics),
+                ),
+            )
+            report_id = cursor.lastrowid
+            self._conn.execute(
+                "INSERT INTO reports_fts (rowid, query, summary, insights) VALUES (?, ?, ?, ?)",
+                (report_id, result.query, report.short_summary, "\n".join(report.key_insights)),
+            )
+            self._conn.commit()
+        return report_id
+
+    def find_similar(self, query: str, limit: int = 5) -> List[StoredReport]:
+        """Return past reports matching a query, most similar first
+
+        Exact matches of the normalized query come first; other candidates are
+        found through the full-text index and scored by term overlap with the
+        stored query.
+        """
+        terms = _terms(query)
+        if not terms:
+            return []
+        # Quote every term so user input cannot inject FTS query syntax
+        match = " OR ".join(f'"{t}"' for t in terms)
+
+        with self._lock:
+            exact = self._conn.execute(
+                """SELECT r.id, r.query, r.created_at, r.short_summary FROM reports r
+                   WHERE r.normalized_query = ? ORDER BY r.created_at DESC LIMIT ?""",
+                (normalize_query(query), limit),
+            ).fetchall()
+            candidates = self._conn.execute(
+                """SELECT r.id, r.query, r.created_at, r.short_summary FROM reports_fts
+                   JOIN reports r ON r.id = reports_fts.rowid
+                   WHERE reports_fts MATCH ?
+                   ORDER BY bm25(reports_fts, 10.0, 2.0, 1.0) LIMIT ?""",
+                (match, limit * 4),
+            ).fetchall()
+
+        matches, seen = [], set()
+        for row_id, stored_query, created_at, summary in exact + candidates:
+            if row_id in seen:
+                continue
+            seen.add(row_id)
+            stored_terms = _terms(stored_query)
+            similarity = len(terms & stored_terms) / len(terms | stored_terms)
+            matches.append(StoredReport(row_id, stored_query, created_at, summary, similarity))
+
+        matches.sort(key=lambda m: (m.similarity, m.created_at), reverse=True)
+        return matches[:limit]
+
+    def load(self, report_id: int) -> Optional[Dict[str, Any]]:
+        """Load a stored run: query, plan, searches, search_results, report and metrics"""
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT query, plan, searches, search_results, report, metrics
+                   FROM reports WHERE id = ?""",
+                (report_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        query, plan, searches, search_results, report, run_metrics = row
+        return {
+            "query": query,
+            "plan": WebSearchPlan.model_validate_json(plan),
+            "searches": [WebSearchItem.model_validate(s) for s in json.loads(searches)],
+            "search_results": json.loads(search_results),
+            "report": ReportData.model_validate_json(report),
+            "metrics": json.loads(run_metrics) if run_metrics else {},
+        }
+
+
+_store: Optional[ReportStore] = None
+_store_lock = threading.Lock()
+
+
+def get_report_store() -> ReportStore:
+    """Return the process-wide report store at REPORT_STORE_PATH"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReportStore(os.environ.get("REPORT_STORE_PATH", DEFAULT_STORE_PATH))
+    return _store
@@ -0,0 +1,165 @@
+import os
+import re
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it the brief packs whole findings by priority
+    np = None
+
+from .text import content_words
+
+# Passages selected for the writer at most
+RERANK_TOP_K = int(os.environ.get("RERANK_TOP_K", 60))
+# Weight of novelty against relevance when selecting passages (0 ranks by relevance alone)
+RERANK_DIVERSITY = float(os.environ.get("RERANK_DIVERSITY", 0.3))
+
+# Paragraphs longer than this are split into runs of sentences
+MAX_PASSAGE_WORDS = 120
+
+# Citation markers left by SourceRegistry.cite, like [3] or [S3]
+CITATION = re.compile(r"\[S?\d+\]")
+
+
+def rerank_available() -> bool:
+    return np is not None
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase content words, without stopwords or citation markers"""
+    return content_words(CITATION.sub(" ", text))
+
+
+def split_passages(text: str, max_words: int = MAX_PASSAGE_WORDS) -> List[str]:
+    """Split text into paragraphs, cutting long paragraphs into runs of whole sentences
+
+    A run cut from a paragraph that has no citation of its own carries the
+    paragraph's citations, so that every passage can be attributed.
+    """
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph.split()) <= max_words:
+            passages.append(paragraph)
+            continue
+        runs, run, words = [], [], 0
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            count = len(sentence.split())
+            if run and words + count > max_words:
+                runs.append(" ".join(run))
+                run, words = [], 0
+            run.append(sentence)
+            words += count
+        if run:
+            runs.append(" ".join(run))
+        citations = " ".join(dict.fromkeys(CITATION.findall(paragraph)))
+        passages.extend(f"{r} {citations}" if citations and not CITATION.search(r) else r for r in runs)
+    return passages
+
+
+class Vocabulary:
+    """Maps terms to the integer ids the index works with"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self, text: str) -> "np.ndarray":
+        return np.array([self._ids.setdefault(term, len(self._ids)) for term in tokenize(text)], dtype=np.int64)
+
+
+class PassageIndex:
+    """
+    BM25 and TF-IDF over a set of passages, as flat NumPy arrays.
+
+    Each (passage, term) pair is one entry, so scoring a query is one
+    bincount over the entries rather than a loop over passages.
+    """
+
+    def __init__(self, passages: Sequence["np.ndarray"], vocab_size: int, k1: float = 1.2, b: float = 0.75):
+        self.size = len(passages)
+        self.vocab_size = max(1, vocab_size)
+        lengths = np.array([len(p) for p in passages], dtype=np.float64)
+        docs = np.repeat(np.arange(self.size), lengths.astype(np.int64))
+        terms = np.concatenate(passages) if self.size else np.empty(0, dtype=np.int64)
+
+        pairs, tf = np.unique(docs * self.vocab_size + terms, return_counts=True)
+        self.docs, self.terms = np.divmod(pairs, self.vocab_size)
+        df = np.bincount(self.terms, minlength=self.vocab_size)
+        idf = np.log1p((self.size - df + 0.5) / (df + 0.5))
+
+        avg_length = lengths.mean() if self.size and lengths.mean() > 0 else 1.0
+        norm = k1 * (1 - b + b * lengths[self.docs] / avg_length)
+        self.bm25 = idf[self.terms] * tf * (k1 + 1) / (tf + norm)
+        self.tfidf = idf[self.terms] * (1 + np.log(tf))
+
+    def score(self, query: "np.ndarray") -> "np.ndarray":
+        """BM25 score of every passage for a query's term ids"""
+        query = query[query < self.vocab_size]
+        wanted = np.zeros(self.vocab_size, dtype=bool)
+        wanted[query] = True
+        return np.bincount(self.docs, weights=self.bm25 * wanted[self.terms], minlength=self.size)
+
+    def vectors(self, docs: "np.ndarray") -> "np.ndarray":
+        """L2-normalized TF-IDF rows for the given passages, over just the terms they use"""
+        row_of = np.full(self.size, -1)
+        row_of[docs] = np.arange(len(docs))
+        rows = row_of[self.docs]
+        mask = rows >= 0
+        columns, column_of = np.unique(self.terms[mask], return_inverse=True)
+        matrix = np.zeros((len(docs), len(columns)))
+        matrix[rows[mask], column_of] = self.tfidf[mask]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def relevance(index: PassageIndex, query: "np.ndarray", aspects: Sequence["np.ndarray"]) -> "np.ndarray":
+    """Relevance of each passage (0-1) to the query and to its best-matching aspect
+
+    Scores are scaled by their maximum so the query and the aspects weigh
+    the same however many terms each has.
+    """
+    def scaled(scores):
+        top = scores.max() if len(scores) else 0.0
+        return scores / top if top > 0 else scores
+
+    query_scores = scaled(index.score(query))
+    if not aspects:
+        return query_scores
+    aspect_scores = np.max([scaled(index.score(aspect)) for aspect in aspects], axis=0)
+    return 0.5 * query_scores + 0.5 * aspect_scores
+
+
+class MMRSelector:
+    """
+    Maximal marginal relevance over the most relevant passages.
+
+    Iterating yields (passage, similarity to the closest accepted passage),
+    best marginal score first; call accept() for each passage actually kept
+    so later candidates are penalized for repeating it.
+    """
+
+    def __init__(self, index: PassageIndex, scores: "np.ndarray", pool_size: int,
+                 diversity: float = RERANK_DIVERSITY):
+        self.diversity = diversity
+        self.pool = np.argsort(-scores, kind="stable")[:pool_size]
+        self.scores = scores[self.pool]
+        self.vectors = index.vectors(self.pool)
+        self._closest = np.zeros(len(self.pool))
+        self._open = np.ones(len(self.pool), dtype=bool)
+        self._row: Dict[int, int] = {int(doc): row for row, doc in enumerate(self.pool)}
+
+    def __iter__(self) -> Iterator[Tuple[int, float]]:
+        while self._open.any():
+            marginal = (1 - self.diversity) * self.scores - self.diversity * self._closest
+            row = int(np.argmax(np.where(self._open, marginal, -np.inf)))
+            self._open[row] = False
+            yield int(self.pool[row]), float(self._closest[row])
+
+    def accept(self, passage: int):
+        similarity = self.vectors @ self.vectors[self._row[passage]]
+        np.maximum(self._closest, similarity, out=self._closest)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+from agents import RunHooks, Runner
+from openai.types.responses import ResponseTextDeltaEvent
+from pydantic import BaseModel
+
+from models import schemas
+from models.schemas import WebSearchItem
+from tools.cassette import get_cassette
+from tools.metrics import record_model_usage
+from tools.search_cache import normalize_query
+from tools.single_flight import agent_flight
+from tools.rate_limit import openai_limiter
+from .streaming import StreamingFieldExtractor
+
+
+@dataclass
+class ReplayedRunResult:
+    """Stand-in for the SDK's RunResult when an agent run is replayed from a cassette"""
+    final_output: Any
+
+
+def _cassette_key(agent, input_text: str) -> str:
+    return f"{agent.name}:{hashlib.sha1(input_text.encode('utf-8')).hexdigest()}"
+
+
+def _encode_result(result) -> Dict[str, Any]:
+    output = result.final_output
+    if isinstance(output, BaseModel):
+        return {"model": type(output).__name__, "data": output.model_dump()}
+    return {"model": None, "data": output}
+
+
+def _decode_result(recorded: Dict[str, Any]) -> ReplayedRunResult:
+    if recorded["model"] is None:
+        return ReplayedRunResult(recorded["data"])
+    return ReplayedRunResult(getattr(schemas, recorded["model"]).model_validate(recorded["data"]))
+
+
+class _RateLimitHooks(RunHooks):
+    """Wait for the shared OpenAI rate limiter before every model request of a run
+
+    One agent run makes a model request per turn (e.g. after each tool call),
+    so limiting whole runs would not bound the request rate.
+    """
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        await openai_limiter.acquire()
+
+
+_rate_limit_hooks = _RateLimitHooks()
+
+
+def _record_usage(agent, result):
+    usage = result.context_wrapper.usage
+    record_model_usage(str(agent.model), usage.input_tokens, usage.output_tokens, usage.requests)
+
+
+async def run_agent(agent, input_text: str):
+    """Run an agent, each of its model requests waiting for the shared OpenAI rate limiter"""
+    async def run():
+        result = await Runner.run(agent, input_text, hooks=_rate_limit_hooks)
+        _record_usage(agent, result)
+        return result
+
+    cassette = get_cassette()
+    if cassette is None:
+        return await run()
+    return await cassette.call("agent", _cassette_key(agent, input_text), run,
+                               encode=_encode_result, decode=_decode_result)
+
+
+async def run_agent_streamed(agent, input_text: str, field: str, on_update: Callable[[str], None],
+                             interval: float = 0.15):
+    """Run an agent with streaming, passing the partial text of one output field to on_update"""
+    async def run():
+        result = Runner.run_streamed(agent, input_text, hooks=_rate_limit_hooks)
+        extractor = StreamingFieldExtractor(field)
+        last_update = 0.0
+
+        async for event in result.stream_events():
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                text = extractor.feed(event.data.delta)
+                # Throttle UI refreshes; re-rendering a long report on every token is expensive
+                now = time.monotonic()
+                if text and now - last_update >= interval:
+                    on_update(text)
+                    last_update = now
+
+        if extractor.value:
+            on_update(extractor.value)
+        _record_usage(agent, result)
+        return result
+
+    cassette = get_cassette()
+    if cassette is None:
+        return await run()
+    result = await cassette.call("agent", _cassette_key(agent, input_text), run,
+                                 encode=_encode_result, decode=_decode_result)
+    if isinstance(result, ReplayedRunResult):
+        # Replays have no token stream; deliver the finished field in one update
+        on_update(getattr(result.final_output, field))
+    return result
+
+
+async def run_search_agent(agent, item: WebSearchItem, input_text: str):
+    """Run a search agent, sharing one run between identical concurrent searches across sessions"""
+    # By default searches match on agent + normalized query; set SINGLE_FLIGHT_AGENT_KEY=input
+    # to only coalesce runs whose full agent input (including the reason) is identical
+    if os.environ.get("SINGLE_FLIGHT_AGENT_KEY", "query") == "input":
+        key = (agent.name, input_text)
+    else:
+        key = (agent.name, normalize_query(item.query))
+    return await agent_flight.do(key, lambda: run_agent(agent, input_text))
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models.schemas import WebSearchItem
+
+
+class PriorityScheduler:
+    """
+    Run searches with bounded concurrency, dispatching the highest priority first.
+
+    `max_concurrency` caps the total number of running searches and
+    `provider_limits` caps them per search type. When `max_tasks` is set only
+    the highest-priority searches are run; when `deadline` (seconds) passes,
+    searches that have not started yet are dropped. Dropped searches are
+    collected in `self.dropped`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 6,
+        provider_limits: Optional[Dict[str, int]] = None,
+        max_tasks: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.provider_limits = provider_limits or {}
+        self.max_tasks = max_tasks
+        self.deadline = deadline
+        self.dropped: List[WebSearchItem] = []
+
+    @classmethod
+    def from_env(cls) -> "PriorityScheduler":
+        budget = os.environ.get("SEARCH_BUDGET")
+        deadline = os.environ.get("SEARCH_DEADLINE")
+        return cls(
+            max_concurrency=int(os.environ.get("MAX_CONCURRENT_SEARCHES", 6)),
+            provider_limits={
+                "web": int(os.environ.get("MAX_CONCURRENT_WEB_SEARCHES", 4)),
+                "video": int(os.environ.get("MAX_CONCURRENT_VIDEO_SEARCHES", 3)),
+            },
+            max_tasks=int(budget) if budget else None,
+            deadline=float(deadline) if deadline else None,
+        )
+
+    async def stream(
+        self,
+        items: List[WebSearchItem],
+        fn: Callable[[WebSearchItem], Awaitable[Any]],
+    ) -> AsyncIterator[Tuple[WebSearchItem, Any]]:
+        """Yield (item, result) pairs in completion order."""
+        pending = sorted(items, key=lambda s: getattr(s, 'priority', 5), reverse=True)
+        if self.max_tasks is not None:
+            self.dropped.extend(pending[self.max_tasks:])
+            pending = pending[:self.max_tasks]
+
+        started = time.monotonic()
+        running: Dict[asyncio.Task, WebSearchItem] = {}
+        active = Counter()
+
+        try:
+            while pending or running:
+                if self.deadline is not None and time.monotonic() - started > self.deadline:
+                    self.dropped.extend(pending)
+                    pending = []
+
+                # Launch the highest-priority searches that fit within the limits
+                for item in list(pending):
+                    if len(running) >= self.max_concurrency:
+                        break
+                    provider = item.search_type
+                    if active[provider] >= self.provider_limits.get(provider, self.max_concurrency):
+                        continue
+                    pending.remove(item)
+                    active[provider] += 1
+                    running[asyncio.create_task(fn(item))] = item
+
+                if not running:
+                    break
+
+                timeout = None
+                if self.deadline is not None and pending:
+                    timeout = max(0.0, self.deadline - (time.monotonic() - started))
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    item = running.pop(task)
+                    active[item.search_type] -= 1
+                    yield item, task.result()
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def run(
+        self,
+        items: List[WebSearchItem],
+        fn: Callable[[WebSearchItem], Awaitable[Any]],
+    ) -> List[Any]:
+        """Run all searches and return their results in priority order."""
+        completed = {}
+        async for item, result in self.stream(items, fn):
+            completed[id(item)] = result
+        ordered = sorted(items, key=lambda s: getattr(s, 'priority', 5), reverse=True)
+        return [completed[id(item)] for item in ordered if id(item) in completed]
@@ -0,0 +1,103 @@
+import asyncio
+import os
+from typing import Callable, List, Optional
+
+from agents import custom_span
+
+from models.schemas import ReportData, ReportOutline
+from tools.metrics import metrics
+from tools.sources import cited_ids
+from workers import outline_agent, section_writer_agent, report_finisher_agent
+from .brief import RESEARCH_SCOPE, ResearchBrief
+from .runner import run_agent
+
+# Findings budget for each section writer's prompt
+SECTION_CONTEXT_TOKENS = int(os.environ.get("SECTION_CONTEXT_TOKENS", 6000))
+
+metrics.describe("section_drafts_failed_total", "counter", "Report sections that could not be drafted")
+
+
+def stitch_report(outline: ReportOutline, drafts: List[Optional[str]]) -> str:
+    """Join section drafts into one markdown report, skipping sections not yet written"""
+    parts = [f"# {outline.title}"]
+    parts.extend(draft.strip() for draft in drafts if draft)
+    return "\n\n".join(parts)
+
+
+async def write_report_by_sections(query: str, brief: ResearchBrief,
+                                   on_progress: Optional[Callable[[str], None]] = None) -> ReportData:
+    """Write the report as an outline, then all sections in parallel, then a short finishing pass
+
+    Wall time scales with the slowest section rather than the whole document.
+    on_progress receives the stitched markdown each time a section completes.
+    A section whose draft fails is redrafted once; if that fails too, it is
+    replaced by a short placeholder and the error recorded in the trace.
+    """
+    scope = "\n".join(f"{i}. {item}" for i, item in enumerate(RESEARCH_SCOPE, 1))
+    searches = "\n".join(f"- {q}" for q in brief.queries())
+    outline_result = await run_agent(
+        outline_agent,
+        f"Research query: {query}\n\nResearch scope:\n{scope}\n\nSearches run:\n{searches}"
+    )
+    outline: ReportOutline = outline_result.final_output
+    outline_text = "\n".join(f"- {s.title}: {s.focus}" for s in outline.sections)
+
+    drafts: List[Optional[str]] = [None] * len(outline.sections)
+
+    async def draft(index, section):
+        findings = brief.render_findings(SECTION_CONTEXT_TOKENS, relevant_to=f"{section.title} {section.focus}")
+        result = await run_agent(section_writer_agent, f"""Research query: {query}
+
+Your section: {section.title}
+Section focus: {section.focus}
+
+Full report outline:
+{outline_text}
+
+## Relevant research findings:
+{findings}
+""")
+        drafts[index] = result.final_output
+        if on_progress is not None:
+            on_progress(stitch_report(outline, drafts))
+
+    sections = list(enumerate(outline.sections))
+    outcomes = await asyncio.gather(*(draft(i, section) for i, section in sections), return_exceptions=True)
+    failed = [pair for pair, outcome in zip(sections, outcomes) if isinstance(outcome, Exception)]
+    if failed:
+        outcomes = await asyncio.gather(*(draft(i, section) for i, section in failed), return_exceptions=True)
+        for (index, section), outcome in zip(failed, outcomes):
+            if not isinstance(outcome, Exception):
+                continue
+            error = f"{type(outcome).__name__}: {outcome}"
+            with custom_span("Section draft failed", {"section": section.title, "error": error}):
+                metrics.inc("section_drafts_failed_total")
+            drafts[index] = f"## {section.title}\n\n*This section could not be written.*"
+        if on_progress is not None:
+            on_progress(stitch_report(outline, drafts))
+
+    # The finishing pass only needs each section's opening, not the full text
+    openings = "\n\n".join(d.strip()[:800] for d in drafts if d)
+    extras_result = await run_agent(report_finisher_agent, f"""Research query: {query}
+
+## Section openings:
+{openings}
+
+## Video resources:
+{brief.video_resources() or "None found."}
+""")
+    extras = extras_result.final_output
+
+    markdown_report = stitch_report(outline, drafts)
+    sources = brief.render_sources(cited_ids(markdown_report))
+    if sources:
+        references = "\n".join(f"- {line}" for line in sources.splitlines())
+        markdown_report += f"\n\n## References\n\n{references}"
+
+    return ReportData(
+        short_summary=extras.short_summary,
+        markdown_report=markdown_report,
+        recommended_videos=extras.recommended_videos,
+        follow_up_questions=extras.follow_up_questions,
+        key_insights=extras.key_insights,
+    )
@@ -0,0 +1,62 @@
+import json
+import re
+
+
+class StreamingFieldExtractor:
+    """
+    Incrementally decode one string field out of a JSON document streamed in chunks.
+
+    Structured agent output arrives as raw JSON text, so this lets the UI show
+    a field such as `markdown_report` while the rest of the object is still
+    being generated. Each call to `feed` only scans the newly received text.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.value = ""
+        self.done = False
+        self._pattern = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._pos = None
+
+    def feed(self, delta: str) -> str:
+        """Add a chunk of streamed JSON and return the field's text decoded so far."""
+        self._buffer += delta
+        if self.done:
+            return self.value
+
+        if self._pos is None:
+            match = self._pattern.search(self._buffer)
+            if match is None:
+                return self.value
+            self._pos = match.end()
+
+        buf = self._buffer
+        i = safe = self._pos
+        while i < len(buf):
+            char = buf[i]
+            if char == '"':
+                self.done = True
+                break
+            if char == '\\':
+                # Only consume complete escape sequences; wait for more text otherwise
+                if i + 1 >= len(buf):
+                    break
+                if buf[i + 1] == 'u':
+                    width = 6
+                    # Keep UTF-16 surrogate pairs together so they decode to one character
+                    if i + 6 <= len(buf) and 0xD800 <= int(buf[i + 2:i + 6], 16) <= 0xDBFF:
+                        width = 12
+                    if i + width > len(buf):
+                        break
+                    i += width
+                else:
+                    i += 2
+            else:
+                i += 1
+            safe = i
+
+        if safe > self._pos:
+            self.value += json.loads('"' + buf[self._pos:safe] + '"')
+            self._pos = safe
+        return self.value
@@ -0,0 +1,69 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+from .text import content_words
+
+
+def _sentences(text: str) -> List[str]:
+    # Serper snippets often end with an ellipsis; treat it as a sentence boundary
+    text = text.replace("...", ". ").replace("…", ". ")
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if len(s.strip().split()) >= 5]
+
+
+def summarize_results(query: str, reason: str, results: List[Dict[str, Any]], max_sentences: int = 8) -> str:
+    """
+    Condense Serper organic results into cited bullet points without a model call.
+
+    Snippet sentences are scored by their overlap with the query and search
+    reason, plus their similarity to the centroid of all result text (what
+    most sources agree on), with a small bonus for higher-ranked results.
+    The best non-redundant sentences are kept.
+    """
+    query_terms = Counter(content_words(query))
+    reason_terms = set(content_words(reason))
+
+    candidates = []
+    for rank, result in enumerate(results):
+        for sentence in _sentences(result.get('snippet', '')):
+            candidates.append((rank, sentence, content_words(sentence), result))
+    if not candidates:
+        return "No usable search results found."
+
+    centroid = Counter()
+    for _, _, tokens, _ in candidates:
+        centroid.update(set(tokens))
+    centroid_norm = math.sqrt(sum(v * v for v in centroid.values())) or 1.0
+
+    scored = []
+    for rank, sentence, tokens, result in candidates:
+        if not tokens:
+            continue
+        counts = Counter(tokens)
+        query_score = sum(min(counts[t], 1) for t in query_terms) / (len(query_terms) or 1)
+        reason_score = len(reason_terms & counts.keys()) / (len(reason_terms) or 1)
+        centroid_score = sum(centroid[t] * c for t, c in counts.items()) / (
+            centroid_norm * math.sqrt(sum(c * c for c in counts.values()))
+        )
+        position_score = 1.0 / (1 + rank)
+        score = 2.0 * query_score + 0.5 * reason_score + centroid_score + 0.3 * position_score
+        scored.append((score, sentence, set(tokens), result))
+
+    scored.sort(key=lambda s: s[0], reverse=True)
+    picked = []
+    for score, sentence, token_set, result in scored:
+        # Skip sentences that mostly repeat one already picked
+        if any(len(token_set & other) / len(token_set | other) > 0.6 for _, other, _ in picked):
+            continue
+        picked.append((sentence, token_set, result))
+        if len(picked) >= max_sentences:
+            break
+
+    lines = []
+    for sentence, _, result in picked:
+        title = result.get('title', 'Source')
+        link = result.get('link')
+        citation = f"[{title}]({link})" if link else title
+        lines.append(f"- {sentence} ({citation})")
+    return "\n".join(lines)
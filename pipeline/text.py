@@ -0,0 +1,17 @@
+import re
+from typing import List
+
+# Common words that carry no topical signal when scoring or comparing text
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has
+have having he her here hers him his how i if in into is it its itself just me more most my no
+nor not now of off on once only or other our out over own same she should so some such than that
+the their them then there these they this those through to too under until up very was we were
+what when where which while who whom why will with you your
+""".split())
+
+
+def content_words(text: str) -> List[str]:
+    """Lowercase words of text that carry topical signal, without stopwords or single characters"""
+    return [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS and len(w) > 1]
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from tools.batching import RequestBatcher
+
+
+class _Recorder:
+    """A send function that records each batch and answers every request with ten times it"""
+
+    def __init__(self, delay: float = 0.05, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.batches = []
+
+    async def __call__(self, requests):
+        self.batches.append(list(requests))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [request * 10 for request in requests]
+
+
+def test_requests_during_a_send_are_batched():
+    batcher = RequestBatcher("test", window=0.02, max_size=10)
+    send = _Recorder()
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit("web", n, send) for n in range(4)))
+
+    assert asyncio.run(main()) == [0, 10, 20, 30]
+    # The first request goes out alone; the rest wait for the window and share one batch
+    assert send.batches == [[0], [1, 2, 3]]
+    assert batcher.stats() == {"batches": 2, "requests": 4, "open": 0}
+
+
+def test_a_full_batch_is_sent_without_waiting_for_the_window():
+    batcher = RequestBatcher("test", window=10, max_size=2)
+    send = _Recorder()
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit("web", n, send) for n in range(3))), 1)
+
+    assert asyncio.run(main()) == [0, 10, 20]
+    assert send.batches == [[0], [1, 2]]
+
+
+def test_a_send_error_reaches_every_caller_in_the_batch():
+    batcher = RequestBatcher("test", window=0.02, max_size=10)
+    send = _Recorder(error=ValueError("bad batch"))
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit("web", n, send) for n in range(3)),
+                                    return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+    assert [type(outcome) for outcome in outcomes] == [ValueError] * 3
+    assert all(str(outcome) == "bad batch" for outcome in outcomes)
+
+
+def test_a_batch_left_open_by_a_closed_loop_does_not_strand_later_requests():
+    batcher = RequestBatcher("test", window=0.2, max_size=10)
+    send = _Recorder(delay=1)
+
+    async def leave_mid_window():
+        for n in range(2):
+            asyncio.get_running_loop().create_task(batcher.submit("web", n, send))
+        # The second request is waiting in an open batch when the loop closes
+        await asyncio.sleep(0.05)
+        assert batcher.stats()["open"] == 1
+
+    asyncio.run(leave_mid_window())
+    assert batcher.stats()["open"] == 0
+
+    later = _Recorder(delay=0)
+
+    async def main():
+        return await asyncio.wait_for(batcher.submit("web", 5, later), 1)
+
+    assert asyncio.run(main()) == 50
+    assert later.batches == [[5]]
+
+
+def test_a_cancelled_caller_does_not_cancel_its_batch():
+    batcher = RequestBatcher("test", window=0.02, max_size=10)
+    send = _Recorder()
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit("web", 1, send))
+        second = asyncio.ensure_future(batcher.submit("web", 2, send))
+        third = asyncio.ensure_future(batcher.submit("web", 3, send))
+        await asyncio.sleep(0)
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        return await first, await third
+
+    assert asyncio.run(main()) == (10, 30)
+    assert send.batches == [[1], [2, 3]]
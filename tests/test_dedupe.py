@@ -0,0 +1,43 @@
+from models.schemas import WebSearchItem
+from pipeline.dedupe import collapse_duplicate_searches, query_similarity
+
+
+def _search(query: str, priority: int = 3, search_type: str = "web") -> WebSearchItem:
+    return WebSearchItem(reason=f"Research {query}", query=query, search_type=search_type, priority=priority)
+
+
+def test_different_angles_of_a_topic_are_kept_apart():
+    pairs = [
+        ("solid state battery electric vehicles case study", "solid state battery electric vehicles challenges"),
+        ("reinforcement learning from human feedback explained",
+         "reinforcement learning from human feedback limitations"),
+    ]
+    for a, b in pairs:
+        kept, merged = collapse_duplicate_searches([_search(a, 5), _search(b, 4)])
+        assert [s.query for s in kept] == [a, b]
+        assert merged == []
+
+
+def test_reworded_duplicates_are_merged():
+    a = "solid state batteries for electric vehicles"
+    b = "electric vehicle solid state battery"
+    assert query_similarity(a, b) == 1.0
+
+    kept, merged = collapse_duplicate_searches([_search(a, 3), _search(b, 5)])
+    assert [s.query for s in kept] == [b]
+    assert kept[0].priority == 5
+    assert f"Also: Research {a}" in kept[0].reason
+    assert [(dropped.query, into.query) for dropped, into in merged] == [(a, b)]
+
+
+def test_freshness_words_do_not_keep_searches_apart():
+    kept, merged = collapse_duplicate_searches([
+        _search("transformer attention mechanism", 4),
+        _search("latest transformer attention mechanisms", 3),
+        _search("transformer attention mechanism tutorial", 2, search_type="video"),
+    ])
+    assert [(s.search_type, s.query) for s in kept] == [
+        ("web", "transformer attention mechanism"),
+        ("video", "transformer attention mechanism tutorial"),
+    ]
+    assert len(merged) == 1
@@ -0,0 +1,103 @@
+import pytest
+
+from models.schemas import ReportData, WebSearchItem, WebSearchPlan
+from pipeline.engine import PipelineEvent, ResearchResult
+from pipeline.jobs import JobQueue
+
+
+@pytest.fixture
+def queues(tmp_path):
+    """The UI's queue and two workers', each its own connection to one database"""
+    path = str(tmp_path / "jobs.sqlite3")
+    return JobQueue(path), JobQueue(path), JobQueue(path)
+
+
+def _search(query: str) -> WebSearchItem:
+    return WebSearchItem(reason=f"Research {query}", query=query, search_type="web", priority=3)
+
+
+def _result(query: str) -> ResearchResult:
+    report = ReportData(short_summary="Summary", markdown_report="# Report", recommended_videos=[],
+                        follow_up_questions=[], key_insights=[])
+    plan = WebSearchPlan(searches=[_search(query)], strategy="One search")
+    return ResearchResult(query, plan, plan.searches, [], report)
+
+
+def test_a_job_is_claimed_once_and_its_progress_read_back(queues):
+    ui, first, second = queues
+    job_id = ui.submit("solid state batteries", {"deep": True})
+
+    job = first.claim("worker-1")
+    assert (job.id, job.status, job.attempts, job.options) == (job_id, "running", 1, {"deep": True})
+    assert second.claim("worker-2") is None
+
+    assert first.add_event(job, PipelineEvent("search_completed", {"item": _search("anodes")}))
+    assert first.add_event(job, PipelineEvent("report_started", {}))
+    assert first.set_partial_report(job, "# Draft")
+    events = ui.events(job_id)
+    assert [(seq, event.kind) for seq, event in events] == [(1, "search_completed"), (2, "report_started")]
+    assert events[0][1].data["item"] == _search("anodes")
+    assert [seq for seq, _ in ui.events(job_id, after=1)] == [2]
+    assert ui.get(job_id).partial_report == "# Draft"
+
+    assert first.complete(job, _result("solid state batteries"))
+    stored = ui.get(job_id)
+    assert (stored.status, stored.partial_report) == ("completed", None)
+    assert ui.result(job_id).report.markdown_report == "# Report"
+
+
+def test_a_requeued_job_rejects_writes_from_its_old_worker(queues):
+    ui, old, new = queues
+    job_id = ui.submit("solid state batteries")
+    stale = old.claim("worker-1")
+    assert old.add_event(stale, PipelineEvent("plan_started", {}))
+    assert old.set_partial_report(stale, "# Old draft")
+
+    # The worker stops reporting; its progress is cleared along with its claim
+    assert ui.requeue_stale(stale_after=-1) == 1
+    assert ui.events(job_id) == []
+    assert ui.get(job_id).partial_report is None
+
+    current = new.claim("worker-2")
+    assert (current.id, current.attempts) == (job_id, 2)
+    assert new.add_event(current, PipelineEvent("plan_started", {}))
+
+    # The old worker is still running and keeps writing; none of it lands
+    assert not old.heartbeat(stale)
+    assert not old.set_run_id(stale, "old-run")
+    assert not old.add_event(stale, PipelineEvent("report_started", {}))
+    assert not old.set_partial_report(stale, "# Old draft")
+    assert not old.complete(stale, _result("solid state batteries"))
+    assert not old.fail(stale, "Cancelled")
+
+    job = ui.get(job_id)
+    assert (job.status, job.worker, job.run_id, job.partial_report) == ("running", "worker-2", None, None)
+    assert [event.kind for _, event in ui.events(job_id)] == ["plan_started"]
+
+    assert new.heartbeat(current)
+    assert new.complete(current, _result("solid state batteries"))
+    assert ui.get(job_id).status == "completed"
+
+
+def test_a_job_is_failed_once_it_uses_max_attempts(queues):
+    ui, first, second = queues
+    job_id = ui.submit("solid state batteries")
+
+    first.claim("worker-1")
+    assert ui.requeue_stale(stale_after=-1, max_attempts=2) == 1
+    second.claim("worker-2")
+    assert ui.requeue_stale(stale_after=-1, max_attempts=2) == 0
+
+    job = ui.get(job_id)
+    assert (job.status, job.attempts, job.error) == ("failed", 2, "Worker stopped responding")
+    assert first.claim("worker-1") is None
+    assert ui.stats() == {"queued": 0, "running": 0, "completed": 0, "failed": 1}
+
+
+def test_jobs_with_a_recent_heartbeat_are_left_running(queues):
+    ui, worker, _ = queues
+    job_id = ui.submit("solid state batteries")
+    job = worker.claim("worker-1")
+    assert worker.heartbeat(job)
+    assert ui.requeue_stale(stale_after=60) == 0
+    assert ui.get(job_id).status == "running"
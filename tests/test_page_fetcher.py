@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bench.serper_stub import synthetic_page
+from tools.page_fetcher import PageCache, PageFetcher
+
+# Requests the server received, as (path, If-None-Match)
+requests = []
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/image":
+            self.reply(b"\x89PNG" + b"\0" * 1000, "image/png")
+        elif self.path == "/slow":
+            time.sleep(1)
+            self.reply(synthetic_page("slow").encode(), "text/html")
+        elif self.path == "/behind-a-script":
+            # The article only starts after 200 kB of script
+            script = "<script>" + "var x = 1;\n" * 20_000 + "</script>"
+            self.reply((script + synthetic_page("late")).encode(), "text/html")
+        else:
+            page_id = self.path.strip("/")
+            etag = f'"{page_id}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.reply(synthetic_page(page_id).encode(), "text/html; charset=utf-8", etag)
+
+    def reply(self, payload: bytes, content_type: str, etag: str = None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    requests.clear()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch(fetcher: PageFetcher, *urls: str, budget: float = None):
+    async def main():
+        try:
+            return await fetcher.fetch_many(list(urls), budget=budget)
+        finally:
+            await fetcher.aclose()
+    return asyncio.run(main())
+
+
+def test_stale_pages_are_revalidated_with_their_etag(base_url, tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"), fresh_for=0)
+    url = f"{base_url}/a1"
+
+    first = _fetch(PageFetcher(cache=cache, allow_private=True), url)[url]
+    assert first.startswith("Paragraph 1 of article a1")
+    assert "Home" not in first and "Copyright" not in first
+
+    second = _fetch(PageFetcher(cache=cache, allow_private=True), url)[url]
+    assert second == first
+    assert requests == [("/a1", None), ("/a1", '"a1"')]
+
+
+def test_fresh_pages_are_served_from_the_cache(base_url, tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"), fresh_for=3600)
+    url = f"{base_url}/a2"
+    first = _fetch(PageFetcher(cache=cache, allow_private=True), url)
+    assert _fetch(PageFetcher(cache=cache, allow_private=True), url) == first
+    assert requests == [("/a2", None)]
+
+
+def test_non_html_pages_are_skipped(base_url):
+    assert _fetch(PageFetcher(allow_private=True), f"{base_url}/image") == {}
+
+
+def test_reading_stops_at_the_byte_cap(base_url):
+    url = f"{base_url}/behind-a-script"
+    assert _fetch(PageFetcher(allow_private=True, max_bytes=50_000), url) == {}
+    assert "article late" in _fetch(PageFetcher(allow_private=True), url)[url]
+
+
+def test_pages_not_ready_within_the_budget_are_left_out(base_url):
+    fast, slow = f"{base_url}/a3", f"{base_url}/slow"
+    started = time.monotonic()
+    texts = _fetch(PageFetcher(allow_private=True), fast, slow, budget=0.5)
+    assert list(texts) == [fast]
+    assert time.monotonic() - started < 1
+
+
+def test_private_hosts_are_refused_unless_allowed(base_url):
+    assert _fetch(PageFetcher(), f"{base_url}/a4", "http://localhost/a4", "http://[::1]/a4") == {}
+    assert requests == []
+
+
+def test_a_bad_url_is_a_miss_not_an_error(base_url):
+    good = f"{base_url}/a5"
+    texts = _fetch(PageFetcher(allow_private=True), good, "http://[::1", "not a url", "http://exa mple.com/")
+    assert list(texts) == [good]
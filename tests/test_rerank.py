@@ -0,0 +1,82 @@
+import pytest
+
+from pipeline.rerank import CITATION, rerank_available, split_passages, tokenize
+
+needs_numpy = pytest.mark.skipif(not rerank_available(), reason="numpy is not installed")
+
+
+def _sentences(count: int, topic: str) -> str:
+    return " ".join(f"Sentence {i} about {topic} has exactly nine words here." for i in range(count))
+
+
+def test_short_paragraphs_are_passages_as_they_are():
+    text = "First paragraph [S1].\n\n  \n\nSecond paragraph\nwith a line break [S2]."
+    assert split_passages(text) == ["First paragraph [S1].", "Second paragraph\nwith a line break [S2]."]
+
+
+def test_long_paragraphs_are_cut_into_runs_of_whole_sentences():
+    paragraph = _sentences(30, "batteries")
+    passages = split_passages(paragraph, max_words=40)
+    assert len(passages) == 8
+    assert all(len(p.split()) <= 40 for p in passages)
+    assert " ".join(passages) == paragraph
+    assert all(p.endswith("here.") for p in passages)
+
+
+def test_runs_without_a_citation_carry_the_paragraphs_citations():
+    paragraph = f"{_sentences(5, 'anodes')} Anodes swell when charged [S3]. {_sentences(5, 'cathodes')} [S4] [S3]"
+    passages = split_passages(paragraph, max_words=40)
+    assert len(passages) > 2
+    assert all(CITATION.search(p) for p in passages)
+    assert passages[0].endswith("[S3] [S4]")
+
+
+def test_tokenize_drops_stopwords_and_citations():
+    assert tokenize("The anode [S12] of a battery [3] swells") == ["anode", "battery", "swells"]
+
+
+@needs_numpy
+def test_bm25_ranks_passages_that_match_the_query_first():
+    from pipeline.rerank import PassageIndex, Vocabulary, relevance
+
+    passages = [
+        "Cathode materials such as nickel and cobalt set energy density.",
+        "Solid state electrolytes replace the liquid electrolyte in a battery.",
+        "Electric cars sold well last year across Europe.",
+    ]
+    vocab = Vocabulary()
+    ids = [vocab.ids(p) for p in passages]
+    index = PassageIndex(ids, len(vocab))
+
+    scores = relevance(index, vocab.ids("solid state electrolyte"), [])
+    assert int(scores.argmax()) == 1
+    assert scores.max() == pytest.approx(1.0)
+    assert scores[2] == 0
+
+    # The query and the best-matching aspect weigh the same, however many terms each has
+    scores = relevance(index, vocab.ids("solid state electrolyte"), [vocab.ids("cathode nickel cobalt")])
+    assert list(scores) == pytest.approx([0.5, 0.5, 0.0])
+
+
+@needs_numpy
+def test_mmr_prefers_a_new_angle_over_a_near_repeat():
+    from pipeline.rerank import MMRSelector, PassageIndex, Vocabulary, relevance
+
+    passages = [
+        "Solid state batteries use a ceramic electrolyte and lithium metal anode.",
+        "Solid state batteries use a ceramic electrolyte with a lithium metal anode.",
+        "Solid state battery production costs remain high for automakers.",
+    ]
+    vocab = Vocabulary()
+    index = PassageIndex([vocab.ids(p) for p in passages], len(vocab))
+    scores = relevance(index, vocab.ids("solid state batteries ceramic electrolyte"), [])
+    assert scores[1] > scores[2]
+
+    selector = MMRSelector(index, scores, pool_size=3, diversity=0.5)
+    order = []
+    for passage, similarity in selector:
+        order.append((passage, round(similarity, 2)))
+        selector.accept(passage)
+    assert [passage for passage, _ in order] == [0, 2, 1]
+    assert order[0][1] == 0
+    assert order[2][1] > 0.8
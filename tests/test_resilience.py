@@ -0,0 +1,126 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tools import resilience, serper_client
+from tools.resilience import CircuitBreaker, CircuitOpenError
+
+
+class _Clock:
+    """A monotonic clock the test moves by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def _trip(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.allow()
+        breaker.record_failure()
+
+
+def test_the_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    _trip(breaker)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.stats() == {"open": 1, "consecutive_failures": 3, "rejected": 1}
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.state == "half_open"
+
+    breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.allow()
+
+
+def test_a_failed_trial_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30)
+    _trip(breaker)
+    clock.now += 30
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_a_trial_that_never_reports_back_expires(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    _trip(breaker)
+    clock.now += 30
+    breaker.allow()  # This trial is cancelled and records nothing
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    clock.now += 1
+    breaker.allow()
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://serper.test/search")
+    return httpx.HTTPStatusError(f"{status}", request=request, response=httpx.Response(status, request=request))
+
+
+def _request_with_errors(monkeypatch, errors, breaker: CircuitBreaker):
+    """Run SerperClient._request against _post raising `errors` in turn, then succeeding"""
+    errors = list(errors)
+    posts = []
+
+    async def post(self, payload, search_type):
+        posts.append(payload)
+        if errors:
+            raise errors.pop(0)
+        return {"organic": []}
+
+    monkeypatch.setattr(serper_client, "serper_breaker", breaker)
+    monkeypatch.setattr(serper_client, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(serper_client.SerperClient, "_post", post)
+
+    async def main():
+        client = serper_client.SerperClient()
+        try:
+            return await client._request("q", "web", 10)
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), posts
+
+
+def test_rate_limiting_is_retried_without_opening_the_circuit(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    data, posts = _request_with_errors(monkeypatch, [_status_error(429)] * 3, breaker)
+    assert data == {"organic": []}
+    assert len(posts) == 4
+    assert breaker.state == "closed"
+
+
+def test_server_errors_open_the_circuit(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    with pytest.raises(CircuitOpenError):
+        _request_with_errors(monkeypatch, [_status_error(503)] * 3, breaker)
+    assert breaker.state == "open"
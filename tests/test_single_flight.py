@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+from tools.single_flight import SingleFlight
+
+
+class _Counter:
+    """An async call that counts how often it actually runs"""
+
+    def __init__(self, delay: float = 0.05, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.runs = 0
+
+    async def __call__(self):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"result {self.runs}"
+
+
+def test_concurrent_calls_with_one_key_share_one_run():
+    flight = SingleFlight("test")
+    call, other = _Counter(), _Counter()
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", call) for _ in range(5)), flight.do("other", other))
+
+    assert asyncio.run(main()) == ["result 1"] * 6
+    assert (call.runs, other.runs) == (1, 1)
+    assert flight.stats() == {"calls": 6, "coalesced": 4, "in_flight": 0}
+
+
+def test_calls_from_different_event_loops_share_one_run():
+    flight = SingleFlight("test")
+    call = _Counter(delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(flight.do("q", call))))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["result 1"] * 3
+    assert call.runs == 1
+
+
+def test_an_error_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight("test")
+    failing = _Counter(error=ValueError("search failed"))
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", failing) for _ in range(3)), return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+    assert [type(outcome) for outcome in outcomes] == [ValueError] * 3
+    assert failing.runs == 1
+    # A later call runs again rather than getting the stored error
+    assert asyncio.run(flight.do("q", _Counter())) == "result 1"
+
+
+def test_a_waiter_takes_over_when_the_leader_is_cancelled():
+    flight = SingleFlight("test")
+    call = _Counter()
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("q", call))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("q", call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "result 2"
+    assert call.runs == 2
+    assert flight.stats() == {"calls": 2, "coalesced": 0, "in_flight": 0}
@@ -0,0 +1,46 @@
+import json
+
+from pipeline.streaming import StreamingFieldExtractor
+
+
+def _stream(document: str, chunk_size: int):
+    """Feed document to an extractor in chunks, returning it and the value after each chunk"""
+    extractor = StreamingFieldExtractor("markdown_report")
+    values = [extractor.feed(document[i:i + chunk_size]) for i in range(0, len(document), chunk_size)]
+    return extractor, values
+
+
+def test_streamed_field_decodes_like_the_whole_document():
+    report = 'Line one\nwith "quotes", a \\ backslash, tabs\tand unicode: é, 漢字, 🚀 and \u2028.'
+    document = json.dumps({"short_summary": "A summary", "markdown_report": report, "key_insights": ["x"]})
+    for chunk_size in (1, 2, 3, 7, len(document)):
+        extractor, values = _stream(document, chunk_size)
+        assert extractor.done
+        assert values[-1] == report
+        # The value only ever grows, one decoded prefix after another
+        assert all(report.startswith(value) for value in values)
+
+
+def test_ascii_escaped_surrogate_pairs_are_kept_together():
+    report = "rocket 🚀 launch"
+    document = json.dumps({"markdown_report": report}, ensure_ascii=True)
+    assert "\\ud83d\\ude80" in document
+    for chunk_size in (1, 5, 9):
+        extractor, values = _stream(document, chunk_size)
+        assert values[-1] == report
+        assert all(report.startswith(value) for value in values)
+
+
+def test_nothing_is_returned_before_the_field_starts():
+    extractor = StreamingFieldExtractor("markdown_report")
+    assert extractor.feed('{"short_summary": "mentions \\"markdown_report\\": \\"no') == ""
+    assert extractor.feed('t this\\"", "markdown_') == ""
+    assert extractor.feed('report": "# Ti') == "# Ti"
+    assert not extractor.done
+
+
+def test_text_after_the_field_is_ignored():
+    extractor = StreamingFieldExtractor("markdown_report")
+    extractor.feed('{"markdown_report": "done"')
+    assert extractor.done
+    assert extractor.feed(', "follow_up_questions": ["more"]}') == "done"
@@ -0,0 +1,125 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Set, Tuple
+
+SendBatch = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class _BatchCancelled(Exception):
+    """Raised to callers whose batch was cancelled before it was sent."""
+
+
+class RequestBatcher:
+    """
+    Collect requests made within a short window and send them as one batch.
+
+    A request for a key that has nothing else waiting or being sent goes out
+    on its own straight away, so a lone request never waits for company.
+    Otherwise the first request opens a batch; requests with the same key
+    that arrive within `window` seconds join it, up to `max_size`. The batch
+    is then sent with the `send` function of the request that opened (or
+    filled) it, and each response is handed back to its caller. Callers may
+    live on different event loops, so results travel through thread-safe
+    futures, as in SingleFlight.
+    """
+
+    def __init__(self, name: str, window: float, max_size: int):
+        self.name = name
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, List[Tuple[Any, concurrent.futures.Future]]] = {}
+        # Batches being sent, per key
+        self._sending: Dict[Hashable, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, request: Any, send: SendBatch) -> Any:
+        """Add a request to the open batch for `key` and wait for its response"""
+        while True:
+            future = concurrent.futures.Future()
+            with self._lock:
+                batch = self._pending.get(key)
+                opened = batch is None
+                if opened and not self._sending.get(key):
+                    # Nothing to share a request with: send this one now
+                    batch, full = [(request, future)], True
+                else:
+                    if opened:
+                        batch = self._pending[key] = []
+                    batch.append((request, future))
+                    full = len(batch) >= self.max_size
+                    if full:
+                        del self._pending[key]
+                if full:
+                    self._sending[key] = self._sending.get(key, 0) + 1
+
+            if full:
+                self._spawn(self._send(key, batch, send))
+            elif opened:
+                self._spawn(self._send_after_window(key, batch, send))
+
+            try:
+                # Shield so a cancelled caller does not cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _BatchCancelled:
+                # The loop that was sending the batch went away; submit again
+                continue
+
+    def _spawn(self, coro):
+        # Sending is not tied to the opening caller, which may be cancelled meanwhile
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_after_window(self, key: Hashable, batch, send: SendBatch):
+        try:
+            await asyncio.sleep(self.window)
+        except asyncio.CancelledError:
+            # The loop went away with the batch still open: close it, so later
+            # requests open a new one, and have its callers submit again
+            with self._lock:
+                if self._pending.get(key) is not batch:
+                    raise  # Filled up and sent already
+                del self._pending[key]
+            for _, future in batch:
+                future.set_exception(_BatchCancelled())
+            raise
+        with self._lock:
+            if self._pending.get(key) is not batch:
+                return  # Filled up and sent already
+            del self._pending[key]
+            self._sending[key] = self._sending.get(key, 0) + 1
+        await self._send(key, batch, send)
+
+    async def _send(self, key: Hashable, batch, send: SendBatch):
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+        try:
+            responses = await send([request for request, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.set_exception(_BatchCancelled())
+            raise
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self._sending[key] -= 1
+                if not self._sending[key]:
+                    del self._sending[key]
+        for (_, future), response in zip(batch, responses):
+            future.set_result(response)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "open": sum(len(batch) for batch in self._pending.values()),
+            }
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_CASSETTE_PATH = os.path.join(".cache", "cassette.jsonl")
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when no recording exists for a request."""
+
+
+class Cassette:
+    """
+    Record external calls (Serper searches, agent runs) to a JSONL file and replay them.
+
+    In "record" mode every call goes through and its response and latency are
+    appended to the file. In "replay" mode responses are served from the file
+    by key, optionally sleeping for the recorded latency scaled by
+    `latency_scale`, so runs are deterministic and need no API keys.
+    Repeated keys replay their recordings in order, then repeat the last one.
+    """
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+
+        if mode == "replay":
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[f"{entry['kind']}:{entry['key']}"].append(entry)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def entries(self, kind: str) -> List[Dict[str, Any]]:
+        """All recordings of one kind, e.g. for serving them from a stand-in server"""
+        return [e for key, recorded in self._entries.items() if key.startswith(f"{kind}:") for e in recorded]
+
+    async def call(self, kind: str, key: str, fn: Callable[[], Awaitable[Any]],
+                   encode: Callable[[Any], Any] = lambda r: r,
+                   decode: Callable[[Any], Any] = lambda r: r) -> Any:
+        """Run `fn` (recording its result), or replay the recorded result for `key`"""
+        if self.mode == "replay":
+            entry = self._next(f"{kind}:{key}")
+            if self.latency_scale > 0:
+                await asyncio.sleep(entry["latency"] * self.latency_scale)
+            return decode(entry["response"])
+
+        started = time.perf_counter()
+        result = await fn()
+        entry = {
+            "kind": kind,
+            "key": key,
+            "latency": time.perf_counter() - started,
+            "response": encode(result),
+        }
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        return result
+
+    def _next(self, full_key: str) -> Dict[str, Any]:
+        with self._lock:
+            recorded = self._entries.get(full_key)
+            if not recorded:
+                raise CassetteMiss(full_key)
+            index = min(self._cursor[full_key], len(recorded) - 1)
+            self._cursor[full_key] += 1
+            return recorded[index]
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Return the process-wide cassette configured by CASSETTE_MODE, or None when off"""
+    global _cassette
+    mode = os.environ.get("CASSETTE_MODE", "off")
+    if mode == "off":
+        return None
+    with _cassette_lock:
+        if _cassette is None or _cassette.mode != mode:
+            _cassette = Cassette(
+                path=os.environ.get("CASSETTE_PATH", DEFAULT_CASSETTE_PATH),
+                mode=mode,
+                latency_scale=float(os.environ.get("CASSETTE_LATENCY_SCALE", 0)),
+            )
+    return _cassette
@@ -0,0 +1,75 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+# "compact" gives agents one JSON record per result with short keys; "text" the labelled blocks
+SEARCH_OUTPUT_FORMAT = os.environ.get("SEARCH_OUTPUT_FORMAT", "compact")
+# Snippets in compact records are cut to this many characters
+SNIPPET_CHARS = int(os.environ.get("SEARCH_SNIPPET_CHARS", 160))
+# Fetched page text is cut to this many characters (0 keeps all the page fetcher
+# extracted, up to PAGE_FETCH_MAX_CHARS); cutting saves tokens but drops grounding
+CONTENT_CHARS = int(os.environ.get("SEARCH_CONTENT_CHARS", 0))
+# Results kept from any one domain (0 keeps all)
+MAX_RESULTS_PER_DOMAIN = int(os.environ.get("SEARCH_MAX_RESULTS_PER_DOMAIN", 2))
+
+# Short record keys and what they hold, in output order
+WEB_FIELDS = {"t": "title", "u": "url", "s": "snippet", "c": "page text"}
+VIDEO_FIELDS = {"t": "title", "u": "url", "ch": "channel", "min": "minutes", "age": "published", "s": "snippet"}
+
+
+def compact_enabled() -> bool:
+    return SEARCH_OUTPUT_FORMAT != "text"
+
+
+def selected_fields(available: Dict[str, str], env_var: str) -> List[str]:
+    """The record keys listed in env_var (comma-separated), or all of them"""
+    wanted = [k.strip() for k in os.environ.get(env_var, "").split(",") if k.strip()]
+    return [k for k in available if k in wanted] if wanted else list(available)
+
+
+def trim(text: str, max_chars: int) -> str:
+    """Cut text at a word boundary to at most max_chars, marking the cut with an ellipsis"""
+    text = " ".join(text.split())
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip(" ,;:.") + "…"
+
+
+def domain(url: Optional[str]) -> str:
+    host = (urlsplit(url).hostname or "") if url else ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def cap_per_domain(results: Sequence[Dict[str, Any]], max_per_domain: int = MAX_RESULTS_PER_DOMAIN,
+                   key: str = "link") -> List[Dict[str, Any]]:
+    """Keep results in order, skipping those beyond max_per_domain from the same domain"""
+    if max_per_domain <= 0:
+        return list(results)
+    counts: Dict[str, int] = {}
+    kept = []
+    for result in results:
+        name = domain(result.get(key))
+        counts[name] = counts.get(name, 0) + 1
+        if not name or counts[name] <= max_per_domain:
+            kept.append(result)
+    return kept
+
+
+def render_records(kind: str, records: List[Dict[str, Any]], fields: Dict[str, str], selected: List[str]) -> str:
+    """One legend line, then one JSON object per record with just the selected keys
+
+    Records marked "r" were already returned by another search; they carry
+    their title and url only.
+    """
+    legend = ", ".join(f"{k} {fields[k]}" for k in selected)
+    lines = [f"{kind} results, JSON lines ({legend}; r=1 seen in another search)"]
+    for record in records:
+        if record.get("r"):
+            compact = {k: record[k] for k in ("t", "u") if record.get(k)}
+            compact["r"] = 1
+        else:
+            compact = {k: record[k] for k in selected if record.get(k) not in (None, "")}
+        lines.append(json.dumps(compact, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines)
@@ -0,0 +1,222 @@
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# USD per million tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+SERPER_COST_PER_SEARCH = float(os.environ.get("SERPER_COST_PER_SEARCH", 0.001))
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, float("inf"))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide counters, histograms and gauges, exported in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: Dict[str, Dict[LabelKey, list]] = defaultdict(dict)
+        self._gauges: Dict[str, Callable[[], Dict[LabelKey, float]]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        with self._lock:
+            self._counters[name][_label_key(labels)] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            # Per label set: bucket counts, then sum and count
+            series = self._histograms[name].setdefault(key, [0] * len(LATENCY_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def register_gauge(self, name: str, help_text: str, fn: Callable[[], Dict[str, float]], label: str = "stat"):
+        """Export values computed on scrape, e.g. cache statistics, as `name{label="..."}`"""
+        self.describe(name, "gauge", help_text)
+        self._gauges[name] = lambda: {((label, k),): float(v) for k, v in fn().items()}
+
+    def render_prometheus(self) -> str:
+        lines = []
+
+        def header(name, default_kind):
+            kind, help_text = self._help.get(name, (default_kind, name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for key, values in series.items():
+                    for bound, count in zip(LATENCY_BUCKETS, values):
+                        le = "+Inf" if bound == float("inf") else str(bound)
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', le))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {values[-2]}")
+                    lines.append(f"{name}_count{_format_labels(key)} {values[-1]}")
+
+        for name, fn in sorted(self._gauges.items()):
+            header(name, "gauge")
+            for key, value in fn().items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("research_stage_seconds", "histogram", "Latency of pipeline stages")
+metrics.describe("serper_request_seconds", "histogram", "Latency of Serper HTTP requests")
+metrics.describe("serper_requests_total", "counter", "Serper HTTP requests by outcome")
+metrics.describe("serper_retries_total", "counter", "Retried Serper HTTP requests")
+metrics.describe("serper_hedged_requests_total", "counter", "Duplicate Serper requests sent to cut tail latency")
+metrics.describe("searches_merged_total", "counter", "Planned searches merged into a near-duplicate")
+metrics.describe("model_tokens_total", "counter", "Model tokens used, by model and direction")
+metrics.describe("model_requests_total", "counter", "Model API requests, by model")
+metrics.describe("research_cost_usd_total", "counter", "Estimated spend in USD, by provider")
+
+
+class RunMetrics:
+    """Timings, token usage, retries and estimated cost for one research run."""
+
+    def __init__(self, run_id: str, query: str):
+        self.run_id = run_id
+        self.query = query
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}
+        self.searches: Dict[str, float] = {}
+        self.tokens: Dict[str, Dict[str, int]] = defaultdict(lambda: {"input": 0, "output": 0, "requests": 0})
+        self.serper_requests = 0
+        self.serper_retries = 0
+        self.cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "query": self.query,
+            "started_at": self.started_at,
+            "stages": dict(self.stages),
+            "searches": dict(self.searches),
+            "tokens": {model: dict(usage) for model, usage in self.tokens.items()},
+            "serper_requests": self.serper_requests,
+            "serper_retries": self.serper_retries,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+current_run: contextvars.ContextVar[Optional[RunMetrics]] = contextvars.ContextVar("current_run", default=None)
+
+
+@contextmanager
+def timed_stage(stage: str, name: Optional[str] = None):
+    """Time a pipeline stage into the registry and the current run's summary"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("research_stage_seconds", elapsed, stage=stage)
+        run = current_run.get()
+        if run is not None:
+            with run._lock:
+                if name is None:
+                    run.stages[stage] = run.stages.get(stage, 0.0) + elapsed
+                else:
+                    run.searches[name] = elapsed
+
+
+def record_serper_request(search_type: str, elapsed: float, outcome: str):
+    metrics.observe("serper_request_seconds", elapsed, search_type=search_type)
+    metrics.inc("serper_requests_total", outcome=outcome, search_type=search_type)
+    if outcome == "ok":
+        metrics.inc("research_cost_usd_total", SERPER_COST_PER_SEARCH, provider="serper")
+    run = current_run.get()
+    if run is not None:
+        with run._lock:
+            run.serper_requests += 1
+            if outcome == "ok":
+                run.cost_usd += SERPER_COST_PER_SEARCH
+
+
+def record_serper_retry(search_type: str):
+    metrics.inc("serper_retries_total", search_type=search_type)
+    run = current_run.get()
+    if run is not None:
+        with run._lock:
+            run.serper_retries += 1
+
+
+def record_model_usage(model: str, input_tokens: int, output_tokens: int, requests: int):
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+    metrics.inc("model_tokens_total", input_tokens, model=model, direction="input")
+    metrics.inc("model_tokens_total", output_tokens, model=model, direction="output")
+    metrics.inc("model_requests_total", requests, model=model)
+    metrics.inc("research_cost_usd_total", cost, provider="openai")
+    run = current_run.get()
+    if run is not None:
+        with run._lock:
+            usage = run.tokens[model]
+            usage["input"] += input_tokens
+            usage["output"] += output_tokens
+            usage["requests"] += requests
+            run.cost_usd += cost
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        payload = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """Serve /metrics for Prometheus from a background thread (once per process)"""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
@@ -0,0 +1,335 @@
+import asyncio
+import codecs
+import ipaddress
+import os
+import re
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from .metrics import metrics
+
+DEFAULT_PAGE_CACHE_PATH = os.path.join(".cache", "page_cache.sqlite3")
+
+# Pages fetched per web search, and how long the tool waits for them in total
+PAGE_FETCH_TOP = int(os.environ.get("PAGE_FETCH_TOP", 3))
+PAGE_FETCH_BUDGET = float(os.environ.get("PAGE_FETCH_BUDGET", 5))
+# Result links may point anywhere; loopback and private addresses are refused unless allowed
+PAGE_FETCH_ALLOW_PRIVATE = os.environ.get("PAGE_FETCH_ALLOW_PRIVATE", "0") == "1"
+
+USER_AGENT = "Mozilla/5.0 (compatible; DeepResearchAgent/1.0)"
+
+# Elements whose text is never article content
+SKIP_TAGS = {"script", "style", "noscript", "svg", "nav", "header", "footer", "aside", "form", "iframe", "template"}
+BLOCK_TAGS = {"p", "div", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "br", "section", "article", "blockquote", "pre"}
+
+metrics.describe("page_fetches_total", "counter", "Page fetches by outcome")
+
+
+class _PrivateHostError(Exception):
+    """Raised for a request to a loopback, private or link-local address."""
+
+
+async def _is_public_host(host: str) -> bool:
+    """Whether every address the host resolves to is a public one"""
+    try:
+        addresses = [ipaddress.ip_address(host.strip("[]"))]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+        except OSError:
+            return False
+        addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    for address in addresses:
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return False
+    return bool(addresses)
+
+
+class _TextExtractor(HTMLParser):
+    """Incremental HTML-to-text extraction that can stop once it has enough text"""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title = ""
+        self._parts: List[str] = []
+        self._length = 0
+        self._skip_depth = 0
+        self._in_title = False
+
+    @property
+    def done(self) -> bool:
+        # Read past max_chars, as menu and boilerplate lines are filtered out afterwards
+        return self._length >= self.max_chars * 2
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth or self.done:
+            return
+        text = re.sub(r"\s+", " ", data)
+        if text.strip():
+            self._parts.append(text)
+            self._length += len(text)
+
+    def text(self) -> str:
+        lines = (line.strip() for line in "".join(self._parts).splitlines())
+        # Keep lines that read like prose rather than menus and button labels
+        text = "\n".join(line for line in lines if len(line.split()) >= 6)
+        return text[:self.max_chars]
+
+
+def html_to_text(html: str, max_chars: int = 3000) -> str:
+    """The readable text of an HTML document, as the fetcher extracts it"""
+    extractor = _TextExtractor(max_chars)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+class PageCache:
+    """SQLite cache of extracted page text with ETag / Last-Modified validators."""
+
+    def __init__(self, path: str = DEFAULT_PAGE_CACHE_PATH, fresh_for: float = 3600):
+        self.path = path
+        self.fresh_for = fresh_for
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS page_cache (
+                url TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Tuple[str, Optional[str], Optional[str], bool]]:
+        """Return (text, etag, last_modified, fresh) for a cached page, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, etag, last_modified, fetched_at FROM page_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        text, etag, last_modified, fetched_at = row
+        return text, etag, last_modified, time.time() - fetched_at < self.fresh_for
+
+    def set(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_cache VALUES (?, ?, ?, ?, ?)",
+                (url, text, etag, last_modified, time.time()),
+            )
+            self._conn.commit()
+
+    def touch(self, url: str):
+        """Mark a cached page as revalidated just now"""
+        with self._lock:
+            self._conn.execute("UPDATE page_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+
+class PageFetcher:
+    """
+    Fetch pages concurrently and extract their readable text.
+
+    At most `max_concurrency` fetches run at once and at most `per_host` per
+    host. Bodies are streamed into the extractor, which stops reading once it
+    has `max_chars` of text or `max_bytes` have arrived. With a PageCache,
+    fresh pages are served from disk and stale ones revalidated with
+    If-None-Match / If-Modified-Since. Requests to hosts that resolve to
+    loopback, private or link-local addresses, redirects included, are
+    refused unless `allow_private` is set.
+    """
+
+    def __init__(self, cache: Optional[PageCache] = None, max_concurrency: int = 16, per_host: int = 2,
+                 max_bytes: int = 1_000_000, max_chars: int = 3000, timeout: float = 8.0,
+                 allow_private: bool = False):
+        self.cache = cache
+        self.allow_private = allow_private
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            event_hooks={"request": [self._check_host]},
+        )
+
+    async def _check_host(self, request: httpx.Request):
+        if not self.allow_private and not await _is_public_host(request.url.host):
+            raise _PrivateHostError(request.url.host)
+
+    async def fetch_many(self, urls: List[str], budget: Optional[float] = None) -> Dict[str, str]:
+        """Fetch pages concurrently, returning the text of those ready within `budget` seconds"""
+        if not urls:
+            return {}
+        tasks = {asyncio.ensure_future(self.fetch(url)): url for url in urls}
+        done, pending = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            task.cancel()
+        texts = {}
+        for task in done:
+            text = task.result()
+            if text:
+                texts[tasks[task]] = text
+        return texts
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """Return the extracted text of a page, or None if it could not be read
+
+        Any error with one page (a malformed URL, a refused host, a network or
+        cache error) is a miss, so it never fails the search it belongs to.
+        """
+        try:
+            return await self._fetch(url)
+        except _PrivateHostError:
+            metrics.inc("page_fetches_total", outcome="blocked")
+        except Exception:
+            metrics.inc("page_fetches_total", outcome="error")
+        return None
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache is not None else None
+        if cached is not None and cached[3]:
+            metrics.inc("page_fetches_total", outcome="cache")
+            return cached[0]
+
+        headers = {}
+        if cached is not None:
+            if cached[1]:
+                headers["If-None-Match"] = cached[1]
+            if cached[2]:
+                headers["If-Modified-Since"] = cached[2]
+
+        host = urlsplit(url).hostname or ""
+        host_semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with self._semaphore, host_semaphore:
+            async with self._client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached is not None:
+                    metrics.inc("page_fetches_total", outcome="revalidated")
+                    await asyncio.to_thread(self.cache.touch, url)
+                    return cached[0]
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                if "html" not in content_type and "text/plain" not in content_type:
+                    metrics.inc("page_fetches_total", outcome="skipped")
+                    return None
+                text = await self._extract(response, plain="html" not in content_type)
+
+        metrics.inc("page_fetches_total", outcome="ok")
+        if self.cache is not None and text:
+            await asyncio.to_thread(
+                self.cache.set, url, text, response.headers.get("etag"), response.headers.get("last-modified")
+            )
+        return text
+
+    async def _extract(self, response: httpx.Response, plain: bool) -> str:
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        extractor = _TextExtractor(self.max_chars)
+        received = 0
+        chunks = []
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            text = decoder.decode(chunk)
+            if plain:
+                chunks.append(text)
+                if sum(len(c) for c in chunks) >= self.max_chars:
+                    break
+            else:
+                extractor.feed(text)
+                if extractor.done:
+                    break
+            if received >= self.max_bytes:
+                break
+        if plain:
+            return "".join(chunks)[:self.max_chars].strip()
+        extractor.close()
+        return extractor.text()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+# One fetcher per event loop, like the Serper clients
+_fetchers: Dict[asyncio.AbstractEventLoop, PageFetcher] = {}
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Return the process-wide page cache, or None when disabled via PAGE_CACHE_ENABLED=0."""
+    global _cache
+    if os.environ.get("PAGE_CACHE_ENABLED", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache(
+                path=os.environ.get("PAGE_CACHE_PATH", DEFAULT_PAGE_CACHE_PATH),
+                fresh_for=float(os.environ.get("PAGE_CACHE_FRESH_FOR", 3600)),
+            )
+    return _cache
+
+
+def get_page_fetcher() -> Optional[PageFetcher]:
+    """Return the page fetcher for the running event loop, or None when disabled via PAGE_FETCH_ENABLED=0."""
+    if os.environ.get("PAGE_FETCH_ENABLED", "1") == "0" or PAGE_FETCH_TOP <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    fetcher = _fetchers.get(loop)
+    if fetcher is None:
+        for stale in [l for l in _fetchers if l.is_closed()]:
+            del _fetchers[stale]
+        fetcher = PageFetcher(
+            cache=get_page_cache(),
+            per_host=int(os.environ.get("PAGE_FETCH_PER_HOST", 2)),
+            max_bytes=int(os.environ.get("PAGE_FETCH_MAX_BYTES", 1_000_000)),
+            max_chars=int(os.environ.get("PAGE_FETCH_MAX_CHARS", 3000)),
+            allow_private=PAGE_FETCH_ALLOW_PRIVATE,
+        )
+        _fetchers[loop] = fetcher
+    return fetcher
+
+
+async def close_page_fetcher(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """Close the page fetcher for the given (default: running) event loop."""
+    loop = loop or asyncio.get_running_loop()
+    fetcher = _fetchers.pop(loop, None)
+    if fetcher is not None:
+        await fetcher.aclose()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every session in the process.
+
+    State is guarded by a thread lock rather than an asyncio primitive because
+    callers run on different event loops. With env_prefix, the rate and burst
+    capacity are read from <env_prefix>_RATE_LIMIT and <env_prefix>_BURST on
+    first use rather than at import, so settings loaded from .env later apply.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, env_prefix: Optional[str] = None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.env_prefix = env_prefix
+        self._configured = env_prefix is None
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _configure(self):
+        self.rate = float(os.environ.get(f"{self.env_prefix}_RATE_LIMIT", self.rate))
+        self.capacity = float(os.environ.get(f"{self.env_prefix}_BURST", self.capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._configured = True
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available. A rate of 0 disables limiting."""
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    self._configure()
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the tokens up front so concurrent callers queue up behind us
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Requests per second to Serper, and model requests per second against the OpenAI API
+serper_limiter = TokenBucket("serper", rate=5, capacity=10, env_prefix="SERPER")
+openai_limiter = TokenBucket("openai", rate=2, capacity=8, env_prefix="OPENAI")
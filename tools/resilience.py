@@ -0,0 +1,140 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a service keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected for `reset_timeout` seconds. Then a single trial call is let
+    through (half-open): success closes the circuit, failure opens it again.
+    Shared by every session in the process, so state is guarded by a thread lock.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go ahead"""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            # A trial that never reported back (e.g. was cancelled) expires after reset_timeout
+            now = time.monotonic()
+            if state == "half_open" and (self._trial_started is None
+                                         or now - self._trial_started >= self.reset_timeout):
+                self._trial_started = now
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open after repeated failures)")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_started is not None or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_started = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "open": 1 if self._state() != "closed" else 0,
+                "consecutive_failures": self.failures,
+                "rejected": self.rejected,
+            }
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies for percentile estimates"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile (0-100), or None until enough samples are seen"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def hedged(fn: Callable[[], Awaitable[T]], delay: Optional[float],
+                 on_hedge: Optional[Callable[[], Any]] = None) -> T:
+    """
+    Await `fn()`, starting a duplicate call if the first has not finished after
+    `delay` seconds, and return whichever succeeds first.
+
+    The slower call is cancelled. If one call fails the other is still awaited,
+    so hedging never turns a success into an error. With no delay this is a
+    plain call.
+    """
+    if delay is None:
+        return await fn()
+
+    pending = {asyncio.ensure_future(fn())}
+    error: Optional[BaseException] = None
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            pending.add(asyncio.ensure_future(fn()))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
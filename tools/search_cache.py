@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .metrics import metrics
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "search_cache.sqlite3")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so case, whitespace and word order do not matter."""
+    return " ".join(sorted(query.lower().split()))
+
+
+class SearchCache:
+    """SQLite-backed Serper response cache with per-type TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: Optional[Dict[str, float]] = None,
+        max_entries: int = 5000,
+    ):
+        self.path = path
+        self.ttl = ttl or {"web": 6 * 3600, "video": 24 * 3600}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                search_type TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(query: str, search_type: str, num: int) -> str:
+        return f"{search_type}:{num}:{normalize_query(query)}"
+
+    def get(self, query: str, search_type: str, num: int) -> Optional[Dict[str, Any]]:
+        """Return a cached response, or None if missing or expired."""
+        key = self.make_key(query, search_type, num)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl.get(search_type, 0):
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, query: str, search_type: str, num: int, response: Dict[str, Any]):
+        """Store a response and evict the least recently used entries over the size cap."""
+        key = self.make_key(query, search_type, num)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?)",
+                (key, search_type, json.dumps(response), now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    """DELETE FROM search_cache WHERE key IN (
+                        SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?
+                    )""",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Return the process-wide search cache, or None when disabled via SEARCH_CACHE_ENABLED=0."""
+    global _cache
+    if os.environ.get("SEARCH_CACHE_ENABLED", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache(
+                path=os.environ.get("SEARCH_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl={
+                    "web": float(os.environ.get("SEARCH_CACHE_TTL_WEB", 6 * 3600)),
+                    "video": float(os.environ.get("SEARCH_CACHE_TTL_VIDEO", 24 * 3600)),
+                },
+                max_entries=int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 5000)),
+            )
+    return _cache
+
+
+metrics.register_gauge(
+    "search_cache", "Search cache hits, misses and entries",
+    lambda: _cache.stats() if _cache is not None else {}
+)
@@ -1,111 +1,188 @@
-import json
-import os
-import requests
+from datetime import date
+from typing import Dict, Optional
+
+import httpx
 from agents import function_tool
+from .compact import (
+    CONTENT_CHARS, SNIPPET_CHARS, VIDEO_FIELDS, WEB_FIELDS, cap_per_domain, compact_enabled, render_records, selected_fields, trim,
+)
+from .metrics import metrics
+from .page_fetcher import PAGE_FETCH_BUDGET, PAGE_FETCH_TOP, get_page_fetcher
+from .serper_client import get_serper_client
+from .resilience import CircuitOpenError
+from .sources import SourceRegistry, current_sources
+from .tokens import estimate_tokens
+from .video_ranking import describe_age, rank_videos
+
+metrics.describe("search_tool_calls_total", "counter", "Search tool calls made by agents")
+metrics.describe("search_tool_output_tokens_total", "counter", "Estimated tokens of search tool output read by agents")
+
+
+def unavailable_message(kind: str, error: Exception) -> str:
+    """Tell the agent plainly that a search returned nothing, so it is not summarized as content"""
+    return (f"{kind} unavailable: no results could be retrieved ({error}). "
+            "This is not a search result; continue with the information you already have.")
+
+
+ALREADY_RETRIEVED = "(Already retrieved by another search in this research; not repeated here)"
+
+
+def _register(sources: Optional[SourceRegistry], result) -> bool:
+    """Register a result's page with the run's sources; False if another search already found it"""
+    if sources is None or not result.get('link'):
+        return True
+    _, new = sources.register(result['link'], result.get('title', ''))
+    return new
+
+
+def format_web_results(data, top_result_to_return: int = 10,
+                       sources: Optional[SourceRegistry] = None,
+                       pages: Optional[Dict[str, str]] = None,
+                       compact: Optional[bool] = None,
+                       content_chars: int = CONTENT_CHARS) -> str:
+    """Format the organic results of a Serper response for an agent to read
+
+    With a source registry, pages another search already returned are listed
+    by title and link only, so the same content is not summarized twice.
+    `pages` maps result links to the text fetched from the page, which is
+    included below the snippet. Results beyond SEARCH_MAX_RESULTS_PER_DOMAIN
+    from one domain are skipped. By default (SEARCH_OUTPUT_FORMAT=compact)
+    results are JSON records with short keys and trimmed snippets; page text
+    is cut to `content_chars` only if that is set (SEARCH_CONTENT_CHARS).
+    """
+    if 'organic' not in data or not data['organic']:
+        return "No organic search results found. Try refining your query."
+
+    records = []
+    for result in cap_per_domain(data['organic'])[:top_result_to_return]:
+        link = result.get('link')
+        records.append({
+            "t": result.get('title', 'No title available'),
+            "u": link or 'No link available',
+            "s": result.get('snippet', 'No snippet available'),
+            "c": pages.get(link) if pages and link else None,
+            "r": not _register(sources, result),
+        })
+
+    if compact if compact is not None else compact_enabled():
+        for record in records:
+            record["s"] = trim(record["s"], SNIPPET_CHARS)
+            record["c"] = trim(record["c"], content_chars) if record["c"] else None
+        return render_records("Web", records, WEB_FIELDS, selected_fields(WEB_FIELDS, "WEB_RESULT_FIELDS"))
+
+    string = []
+    for record in records:
+        lines = [f"Title: {record['t']}", f"Link: {record['u']}"]
+        if record["r"]:
+            lines.append(f"Snippet: {ALREADY_RETRIEVED}")
+        else:
+            lines.append(f"Snippet: {record['s']}")
+            if record["c"]:
+                lines.append(f"Content: {record['c']}")
+        string.append('\n'.join(lines + ["\n--------------"]))
+
+    return '\n'.join(string)
+
+
+def format_video_results(data, top_result_to_return: int = 8,
+                         sources: Optional[SourceRegistry] = None,
+                         today: Optional[date] = None,
+                         compact: Optional[bool] = None) -> str:
+    """Format the video results of a Serper response, best first
+
+    Videos under 3 minutes are dropped and the rest ranked locally by
+    recency, length and channel reputation before the top ones are taken.
+    Output follows SEARCH_OUTPUT_FORMAT, as for format_web_results.
+    """
+    if 'videos' not in data or not data['videos']:
+        return "No video results found. Try refining your query."
+
+    today = today or date.today()
+    videos = rank_videos(data['videos'], today)
+    if not videos:
+        return "No video results of 3 minutes or longer found. Try refining your query."
+
+    videos = videos[:top_result_to_return]
+    repeats = [not _register(sources, {'link': video.link, 'title': video.title}) for video in videos]
+
+    if compact if compact is not None else compact_enabled():
+        records = [{
+            "t": video.title,
+            "u": video.link,
+            "ch": video.channel,
+            "min": video.duration_seconds // 60 if video.duration_seconds is not None else None,
+            "age": describe_age(video.published, today),
+            "s": trim(video.snippet, SNIPPET_CHARS),
+            "r": repeat,
+        } for video, repeat in zip(videos, repeats)]
+        return render_records("Video", records, VIDEO_FIELDS, selected_fields(VIDEO_FIELDS, "VIDEO_RESULT_FIELDS"))
+
+    string = []
+    for position, (video, repeat) in enumerate(zip(videos, repeats), 1):
+        minutes = f" ({video.duration_seconds // 60} min)" if video.duration_seconds is not None else ""
+
+        output_elements = [
+            f"Rank {position} (score {video.score:.2f})",
+            f"Title: {video.title}",
+            f"Link: {video.link or 'No link available'}",
+            f"Channel: {video.channel}",
+            f"Duration: {video.duration or 'Unknown'}{minutes}",
+            f"Published: {video.date or 'Unknown date'} ({describe_age(video.published, today)})",
+            f"Snippet: {ALREADY_RETRIEVED if repeat else video.snippet}",
+            "\n--------------"
+        ]
+        string.append('\n'.join(output_elements))
+
+    return '\n'.join(string)
+
+
+def _measured(tool: str, output: str) -> str:
+    """Count the tokens a tool hands its agent, per tool, before returning the output"""
+    metrics.inc("search_tool_calls_total", tool=tool)
+    metrics.inc("search_tool_output_tokens_total", estimate_tokens(output), tool=tool)
+    return output
+
+
+async def fetch_top_pages(data, sources: Optional[SourceRegistry] = None) -> Dict[str, str]:
+    """Fetch the text of the top results no other search has returned yet
+
+    Runs within PAGE_FETCH_BUDGET seconds; pages that are slow or fail are
+    left to their snippet.
+    """
+    fetcher = get_page_fetcher()
+    if fetcher is None:
+        return {}
+    links = [
+        r['link'] for r in cap_per_domain(data.get('organic', []))[:10]
+        if r.get('link') and (sources is None or sources.get(r['link']) is None)
+    ]
+    return await fetcher.fetch_many(links[:PAGE_FETCH_TOP], PAGE_FETCH_BUDGET)
 
 
 @function_tool
-def search_tool(query: str) -> str:
+async def search_tool(query: str) -> str:
     """
     Useful to search the internet about a given topic and return the results
     """
-    top_result_to_return = 10
-    url = "https://google.serper.dev/search"
-    payload = json.dumps({"q": query})
-    headers = {
-        'X-API-KEY': os.environ['SERPER_API_KEY'],
-        'content-type': 'application/json'
-    }
-
     try:
-        response = requests.request("POST", url, headers=headers, data=payload, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-        if 'organic' not in data or not data['organic']:
-            return "No organic search results found. Try refining your query."
+        data = await get_serper_client().search(query, "web")
+        sources = current_sources.get()
+        pages = await fetch_top_pages(data, sources)
+        return _measured("web", format_web_results(data, top_result_to_return=10, sources=sources, pages=pages))
 
-        results = data['organic']
-        string = []
-        for result in results[:top_result_to_return]:
-            try:
-                snippet = result.get('snippet', 'No snippet available')
-                title = result.get('title', 'No title available')
-                link = result.get('link', 'No link available')
-
-                string.append('\n'.join([
-                    f"Title: {title}",
-                    f"Link: {link}",
-                    f"Snippet: {snippet}",
-                    "\n--------------"
-                ]))
-            except KeyError:
-                continue
-
-        return '\n'.join(string)
-
-    except requests.exceptions.RequestException as e:
-        return f"Search error: {str(e)}"
+    except (CircuitOpenError, httpx.HTTPError) as e:
+        return unavailable_message("Web search", e)
 
 
 @function_tool
-def video_search_tool(query: str) -> str:
+async def video_search_tool(query: str) -> str:
     """
-    Search for video content related to a given topic and return the results.
+    Search for video content related to a given topic and return the results, ranked best first.
     """
-    top_result_to_return = 8  # Increased to get more options for filtering
-    url = "https://google.serper.dev/search"
-    payload = json.dumps({"q": query, "type": "videos"})
-    headers = {
-        'X-API-KEY': os.environ['SERPER_API_KEY'],
-        'content-type': 'application/json'
-    }
-
     try:
-        response = requests.request("POST", url, headers=headers, data=payload, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-        if 'videos' not in data or not data['videos']:
-            return "No video results found. Try refining your query."
-
-        results = data['videos']
-        string = []
-        for result in results[:top_result_to_return]:
-            try:
-                # Extract duration and convert to seconds for filtering
-                duration_str = result.get('duration', '0:00')
-
-                # Skip videos less than 3 minutes (180 seconds)
-                minutes, seconds = 0, 0
-                if ':' in duration_str:
-                    parts = duration_str.split(':')
-                    if len(parts) == 2:
-                        minutes, seconds = int(parts[0]), int(parts[1])
-                    elif len(parts) == 3:
-                        hours, minutes, seconds = int(parts[0]), int(parts[1]), int(parts[2])
-                        minutes += hours * 60
-
-                total_seconds = minutes * 60 + seconds
-                if total_seconds < 180:  # Skip videos shorter than 3 minutes
-                    continue
-
-                # Include all available fields in the output
-                output_elements = [
-                    f"Title: {result.get('title', 'No title available')}",
-                    f"Link: {result.get('link', 'No link available')}",
-                    f"Channel: {result.get('channel', 'Unknown channel')}",
-                    f"Duration: {duration_str}",
-                    f"Published: {result.get('date', 'Unknown date')}",
-                    f"Snippet: {result.get('snippet', 'No snippet available')}",
-                    "\n--------------"
-                ]
-
-                string.append('\n'.join(output_elements))
-            except KeyError:
-                continue
-
-        return '\n'.join(string)
-
-    except requests.exceptions.RequestException as e:
-        return f"Video search error: {str(e)}"
\ No newline at end of file
+        data = await get_serper_client().search(query, "video")
+        # Short videos are filtered out before the best 8 are taken
+        return _measured("video", format_video_results(data, top_result_to_return=8, sources=current_sources.get()))
+
+    except (CircuitOpenError, httpx.HTTPError) as e:
+        return unavailable_message("Video search", e)
@@ -0,0 +1,211 @@
+import asyncio
+import importlib.util
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .search_cache import SearchCache, get_search_cache
+from .single_flight import search_flight
+from .rate_limit import serper_limiter
+from .cassette import get_cassette
+from .metrics import metrics, record_serper_request, record_serper_retry
+from .resilience import CircuitBreaker, LatencyTracker, backoff_delay, hedged
+from .batching import RequestBatcher
+
+SERPER_BASE_URL = "https://google.serper.dev"
+SERPER_TIMEOUT = float(os.environ.get("SERPER_TIMEOUT", 10))
+SERPER_MAX_RETRIES = int(os.environ.get("SERPER_MAX_RETRIES", 3))
+# Send a duplicate request when one takes longer than this percentile of recent
+# latencies (e.g. 95); unset disables hedging, which costs an extra search each time
+SERPER_HEDGE_PERCENTILE = os.environ.get("SERPER_HEDGE_PERCENTILE")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# While a search of one type is in flight, others issued within this many seconds
+# (from any session) go to Serper as one batch request; 0 sends every search on its own
+SERPER_BATCH_WINDOW = float(os.environ.get("SERPER_BATCH_WINDOW", 0.05))
+SERPER_BATCH_SIZE = int(os.environ.get("SERPER_BATCH_SIZE", 10))
+
+# HTTP/2 needs the optional `h2` package; fall back to keep-alive HTTP/1.1 without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+# Shared by all clients, so every session sees Serper outages and latency alike
+serper_breaker = CircuitBreaker(
+    "Serper",
+    failure_threshold=int(os.environ.get("SERPER_BREAKER_FAILURES", 5)),
+    reset_timeout=float(os.environ.get("SERPER_BREAKER_RESET", 30)),
+)
+serper_latency = LatencyTracker()
+metrics.register_gauge("serper_circuit", "Serper circuit breaker state", serper_breaker.stats)
+serper_batcher = RequestBatcher("serper", SERPER_BATCH_WINDOW, SERPER_BATCH_SIZE)
+metrics.register_gauge("serper_batches", "Batched Serper requests and the searches they carried",
+                       serper_batcher.stats)
+
+
+def _is_retryable(error: httpx.HTTPError) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+def _is_rate_limited(error: httpx.HTTPError) -> bool:
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
+
+
+def _retry_after(error: httpx.HTTPError) -> Optional[float]:
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            return float(error.response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+    return None
+
+
+class SerperClient:
+    """
+    Async Serper client backed by a shared keep-alive connection pool.
+
+    429s, 5xx responses and transport errors are retried with jittered
+    exponential backoff; slow requests can be hedged with a duplicate; and a
+    circuit breaker fails fast with CircuitOpenError while Serper is down.
+    Concurrent searches are batched into one HTTP request (see RequestBatcher).
+    """
+
+    def __init__(self, timeout: float = SERPER_TIMEOUT, max_connections: int = 20):
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def search(self, query: str, search_type: str = "web", num: int = 10) -> Dict[str, Any]:
+        """Run a Serper query and return the decoded JSON response, serving repeats from the cache."""
+        key = SearchCache.make_key(query, search_type, num)
+        cassette = get_cassette()
+        if cassette is not None:
+            # Record/replay sits above the cache so replays never touch it
+            return await cassette.call("serper", key, lambda: self._shared_search(key, query, search_type, num))
+        return await self._shared_search(key, query, search_type, num)
+
+    async def _shared_search(self, key: str, query: str, search_type: str, num: int) -> Dict[str, Any]:
+        # Identical searches already in flight (from any session) share one request
+        return await search_flight.do(key, lambda: self._cached_search(query, search_type, num))
+
+    async def _cached_search(self, query: str, search_type: str, num: int) -> Dict[str, Any]:
+        cache = get_search_cache()
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, query, search_type, num)
+            if cached is not None:
+                return cached
+
+        data = await self._request(query, search_type, num)
+        if cache is not None:
+            await asyncio.to_thread(cache.set, query, search_type, num, data)
+        return data
+
+    async def _request(self, query: str, search_type: str, num: int) -> Dict[str, Any]:
+        payload = {"q": query, "num": num}
+        if search_type == "video":
+            payload["type"] = "videos"
+
+        hedge_delay = None
+        if SERPER_HEDGE_PERCENTILE:
+            hedge_delay = serper_latency.percentile(float(SERPER_HEDGE_PERCENTILE))
+
+        attempt = 0
+        while True:
+            serper_breaker.allow()
+            try:
+                data = await hedged(
+                    lambda: self._post(payload, search_type), hedge_delay,
+                    lambda: metrics.inc("serper_hedged_requests_total", search_type=search_type)
+                )
+            except httpx.HTTPError as e:
+                if not _is_retryable(e):
+                    # The service answered; the request itself was bad
+                    serper_breaker.record_success()
+                    raise
+                # Rate limiting means Serper is up; backing off handles it, so it never opens the circuit
+                if not _is_rate_limited(e):
+                    serper_breaker.record_failure()
+                if attempt >= SERPER_MAX_RETRIES:
+                    raise
+                delay = _retry_after(e)
+                await asyncio.sleep(min(delay, 30.0) if delay is not None else backoff_delay(attempt))
+                attempt += 1
+                record_serper_retry(search_type)
+                continue
+            serper_breaker.record_success()
+            return data
+
+    async def _post(self, payload: Dict[str, Any], search_type: str) -> Dict[str, Any]:
+        # Timed and recorded per search, in the caller's context, even when batched
+        started = time.perf_counter()
+        try:
+            if SERPER_BATCH_WINDOW > 0:
+                data = await serper_batcher.submit(search_type, payload, self._post_batch)
+            else:
+                (data,) = await self._post_batch([payload])
+        except httpx.HTTPStatusError as e:
+            record_serper_request(search_type, time.perf_counter() - started, f"http_{e.response.status_code}")
+            raise
+        except httpx.HTTPError:
+            record_serper_request(search_type, time.perf_counter() - started, "error")
+            raise
+        elapsed = time.perf_counter() - started
+        record_serper_request(search_type, elapsed, "ok")
+        serper_latency.observe(elapsed)
+        return data
+
+    async def _post_batch(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send one or more searches in a single request (Serper accepts an array of queries)"""
+        headers = {
+            'X-API-KEY': os.environ['SERPER_API_KEY'],
+            'content-type': 'application/json'
+        }
+        await serper_limiter.acquire()
+        # SERPER_BASE_URL can point at a local stand-in server (see bench/serper_stub.py)
+        url = os.environ.get("SERPER_BASE_URL", SERPER_BASE_URL).rstrip("/") + "/search"
+        single = len(payloads) == 1
+        response = await self._client.post(url, headers=headers, json=payloads[0] if single else payloads)
+        response.raise_for_status()
+        data = response.json()
+        if single:
+            return [data]
+        if not isinstance(data, list) or len(data) != len(payloads):
+            raise httpx.DecodingError(f"Expected {len(payloads)} results from a batch request", request=response.request)
+        return data
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# One client per event loop: httpx pools are bound to the loop that created them
+_clients: Dict[asyncio.AbstractEventLoop, SerperClient] = {}
+
+
+def get_serper_client() -> SerperClient:
+    """Return the Serper client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # Drop clients whose loops have already been torn down
+        for stale in [l for l in _clients if l.is_closed()]:
+            del _clients[stale]
+        client = SerperClient()
+        _clients[loop] = client
+    return client
+
+
+async def close_serper_client(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """Close the pooled client for the given (default: running) event loop."""
+    loop = loop or asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
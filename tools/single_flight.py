@@ -0,0 +1,89 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from .metrics import metrics
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """Raised to followers when the call they were waiting on was cancelled."""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one in-flight call.
+
+    Waiters may live on different event loops (each Streamlit session runs its
+    own loop), so the shared result is carried by a thread-safe future.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, concurrent.futures.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn` for `key`, or wait for the identical call already in flight."""
+        while True:
+            with self._lock:
+                self.calls += 1
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._inflight[key] = future
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                return await self._lead(key, future, fn)
+
+            try:
+                # Shield so a cancelled follower does not cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                # The leader went away before finishing; retry, possibly as the new leader
+                with self._lock:
+                    self.calls -= 1
+                    self.coalesced -= 1
+                continue
+
+    async def _lead(self, key: Hashable, future: concurrent.futures.Future, fn: Callable[[], Awaitable[T]]) -> T:
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._finish(key)
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
+
+
+# Process-wide instances shared by every session in the server
+search_flight = SingleFlight("serper_search")
+agent_flight = SingleFlight("agent_run")
+
+for _flight in (search_flight, agent_flight):
+    metrics.register_gauge(f"single_flight_{_flight.name}", "Calls and coalesced calls", _flight.stats)
@@ -0,0 +1,127 @@
+import contextvars
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Click ids added by ad and analytics platforms, besides utm_*; parameters such as
+# ref or source are kept, as on many sites they change what the page shows
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "yclid",
+}
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+MARKDOWN_LINK = re.compile(r"\[([^\]\n]{1,300})\]\((https?://[^)\s]+)\)")
+BARE_URL = re.compile(r"(?<![(\[])\bhttps?://[^\s)\]>\"']+")
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so the same page found by different searches compares equal
+
+    Lowercases the scheme and host, drops www./m. prefixes, default ports,
+    fragments, trailing slashes, utm_* and click-id parameters, sorts the remaining
+    query parameters and maps YouTube short and embed links to watch URLs.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+
+    host = (parts.hostname or "").lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+              if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")]
+
+    if host == "youtu.be" and path:
+        host, params, path = "youtube.com", [("v", path.lstrip("/"))], "/watch"
+    elif host == "youtube.com" and path.startswith(("/embed/", "/shorts/")):
+        params, path = [("v", path.split("/")[2])], "/watch"
+    elif host == "youtube.com" and path == "/watch":
+        params = [(k, v) for k, v in params if k == "v"]
+
+    return urlunsplit(("https", host, path, urlencode(sorted(params)), ""))
+
+
+@dataclass
+class Source:
+    id: int
+    url: str
+    title: str
+
+
+class SourceRegistry:
+    """
+    Run-wide registry of the pages found by every search.
+
+    Pages are keyed by their canonical URL, so the same page returned by
+    several searches is one source with one stable, numbered citation id.
+    Each source keeps the URL it was first found at, as the canonical form
+    is only a comparison key and does not always resolve.
+    """
+
+    def __init__(self):
+        self._by_url: Dict[str, Source] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_url)
+
+    def register(self, url: str, title: str = "") -> Tuple[Source, bool]:
+        """Return the source for a URL and whether it was new to the registry"""
+        canonical = canonicalize_url(url)
+        with self._lock:
+            source = self._by_url.get(canonical)
+            if source is not None:
+                if not source.title and title:
+                    source.title = title
+                return source, False
+            source = Source(len(self._by_url) + 1, url.strip(), title)
+            self._by_url[canonical] = source
+            return source, True
+
+    def get(self, url: str) -> Optional[Source]:
+        with self._lock:
+            return self._by_url.get(canonicalize_url(url))
+
+    def sources(self) -> List[Source]:
+        with self._lock:
+            return sorted(self._by_url.values(), key=lambda s: s.id)
+
+    def cite(self, text: str, prefix: str = "") -> str:
+        """Replace the links in text with citations like [3] (or [S3] with prefix "S")"""
+        def replace_link(match):
+            source, _ = self.register(match.group(2), match.group(1))
+            return f"{match.group(1)} [{prefix}{source.id}]"
+
+        def replace_url(match):
+            url = match.group(0).rstrip(".,;:")
+            source, _ = self.register(url)
+            return f"[{prefix}{source.id}]" + match.group(0)[len(url):]
+
+        return BARE_URL.sub(replace_url, MARKDOWN_LINK.sub(replace_link, text))
+
+
+# The registry of the research run in progress, shared by its search tools
+current_sources: contextvars.ContextVar[Optional[SourceRegistry]] = contextvars.ContextVar(
+    "current_sources", default=None
+)
+
+
+def cited_ids(text: str) -> set:
+    """The numbered citations, like [3], that appear in text
+
+    Only the writers' citation format counts: one to three digits in brackets,
+    not a link's text, so years such as [2024] are not taken for citations.
+    """
+    return {int(n) for n in re.findall(r"\[([1-9]\d{0,2})\](?!\()", text)}
@@ -0,0 +1,15 @@
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional (and may be unable to load its encoding); estimate from length
+    _encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many model tokens a piece of text costs"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
@@ -0,0 +1,134 @@
+import math
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# Videos shorter than this are never recommended
+MIN_VIDEO_SECONDS = 180
+# Length at which a video counts as fully in-depth
+IN_DEPTH_SECONDS = 20 * 60
+# Age at which a video's recency score has halved
+RECENCY_HALF_LIFE_DAYS = 180
+
+# Channels known for substantive educational content, matched case-insensitively
+REPUTABLE_CHANNELS = {
+    "3blue1brown", "computerphile", "crashcourse", "freecodecamp.org", "khan academy", "mit opencourseware",
+    "stanford", "stanford online", "ted", "tedx talks", "two minute papers", "veritasium", "yale courses",
+    "harvard university", "google for developers", "ibm technology", "microsoft research", "nvidia",
+    "andrej karpathy", "lex fridman", "numberphile", "pbs space time", "kurzgesagt – in a nutshell",
+}
+# Words in a channel name that suggest an institution rather than an individual
+REPUTABLE_WORDS = ("university", "institute", "academy", "college", "school", "research", "foundation")
+
+_UNITS = {"minute": 1 / 1440, "hour": 1 / 24, "day": 1, "week": 7, "month": 30, "year": 365}
+_DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y", "%b %Y")
+
+
+@dataclass
+class VideoRecord:
+    title: str
+    link: Optional[str]
+    channel: str
+    duration: str
+    duration_seconds: Optional[int]
+    date: str
+    published: Optional[date]
+    snippet: str
+    rank: int
+    score: float = 0.0
+
+
+def parse_duration(text: str) -> Optional[int]:
+    """Seconds in a duration like 12:05 or 1:02:30, or None if it cannot be read"""
+    parts = (text or "").strip().split(":")
+    if not 2 <= len(parts) <= 3 or not all(p.isdigit() for p in parts):
+        return None
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def parse_published(text: str, today: date) -> Optional[date]:
+    """The date of a relative ("3 weeks ago") or absolute ("Mar 5, 2024") publish date"""
+    text = (text or "").strip()
+    match = re.match(r"(\d+|an?)\s+(minute|hour|day|week|month|year)s?\s+ago", text, re.IGNORECASE)
+    if match:
+        count = 1 if match.group(1).lower() in ("a", "an") else int(match.group(1))
+        return today - timedelta(days=count * _UNITS[match.group(2).lower()])
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def channel_reputation(channel: str) -> float:
+    """1 for known educational channels and institutions, otherwise 0"""
+    name = (channel or "").strip().lower()
+    if name in REPUTABLE_CHANNELS or any(word in name for word in REPUTABLE_WORDS):
+        return 1.0
+    return 0.0
+
+
+def score_video(video: VideoRecord, today: date) -> float:
+    """Weighted score (0-1) for recency, length, channel reputation and search rank"""
+    if video.published is None:
+        recency = 0.3
+    else:
+        age = max(0, (today - video.published).days)
+        recency = math.pow(0.5, age / RECENCY_HALF_LIFE_DAYS)
+    if video.duration_seconds is None:
+        length = 0.3
+    else:
+        length = min(1.0, video.duration_seconds / IN_DEPTH_SECONDS)
+    position = 1.0 / (1 + video.rank)
+    return 0.4 * recency + 0.3 * length + 0.2 * channel_reputation(video.channel) + 0.1 * position
+
+
+def parse_videos(results: List[Dict[str, Any]], today: date) -> List[VideoRecord]:
+    """Structured records for the video results of a Serper response"""
+    return [
+        VideoRecord(
+            title=result.get('title', 'No title available'),
+            link=result.get('link'),
+            channel=result.get('channel', 'Unknown channel'),
+            duration=result.get('duration', ''),
+            duration_seconds=parse_duration(result.get('duration', '')),
+            date=result.get('date', ''),
+            published=parse_published(result.get('date', ''), today),
+            snippet=result.get('snippet', 'No snippet available'),
+            rank=rank,
+        )
+        for rank, result in enumerate(results)
+    ]
+
+
+def rank_videos(results: List[Dict[str, Any]], today: Optional[date] = None,
+                min_seconds: int = MIN_VIDEO_SECONDS) -> List[VideoRecord]:
+    """Drop short videos, then order the rest by score (best first)
+
+    Videos whose duration cannot be read are kept, with a neutral length score.
+    """
+    today = today or date.today()
+    videos = [v for v in parse_videos(results, today)
+              if v.duration_seconds is None or v.duration_seconds >= min_seconds]
+    for video in videos:
+        video.score = score_video(video, today)
+    videos.sort(key=lambda v: (-v.score, v.rank))
+    return videos
+
+
+def describe_age(published: Optional[date], today: date) -> str:
+    if published is None:
+        return "unknown"
+    days = (today - published).days
+    if days < 1:
+        return "today"
+    if days < 60:
+        return f"{days} days ago"
+    if days < 730:
+        return f"{days // 30} months ago"
+    return f"{days // 365} years ago"
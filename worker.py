@@ -0,0 +1,212 @@
+"""
+Research workers: run research jobs queued by the UI in background processes.
+
+    python worker.py --processes 4 --concurrency 2
+    JOB_QUEUE_ENABLED=1 streamlit run app.py
+
+Each process claims jobs from the SQLite job queue (JOB_QUEUE_PATH) and runs
+up to --concurrency of them at a time, recording every pipeline event on the
+job so the UI can follow its progress by job id. A job whose worker dies is
+requeued after JOB_STALE_AFTER seconds and resumes from its checkpoint.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from typing import Set
+
+from dotenv import load_dotenv
+
+# Initialize environment before importing modules that read their settings from it
+load_dotenv(override=True)
+
+from pipeline import ResearchPipeline, PipelineEvent, get_checkpoint_store, get_report_store
+from pipeline.jobs import JOB_STALE_AFTER, Job, JobQueue, get_job_queue
+from tools.page_fetcher import close_page_fetcher
+from tools.serper_client import close_serper_client
+from tools.metrics import start_metrics_server
+
+# Seconds between heartbeats of a running job
+HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", 10))
+# Minimum seconds between saves of the report text being streamed
+PARTIAL_REPORT_INTERVAL = 0.5
+
+
+class JobRecorder:
+    """Record a pipeline's events on its job for the UI to replay
+
+    Writes go to the queue in order on a thread of their own, so a queue
+    database locked by another process does not stall the other jobs on
+    this process's event loop.
+    """
+
+    def __init__(self, queue: JobQueue, job: Job, pipeline: ResearchPipeline):
+        self.queue = queue
+        self.job = job
+        self.pipeline = pipeline
+        # Set once a write finds the job handed to another worker
+        self.lost = False
+        self._run_id = job.run_id
+        self._last_partial = 0.0
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def _write(self, method, *args):
+        def write():
+            if not self.lost and not method(self.job, *args):
+                self.lost = True
+        self._writer.submit(write)
+
+    def handle(self, event: PipelineEvent):
+        if self.pipeline.run_id is not None and self.pipeline.run_id != self._run_id:
+            self._run_id = self.pipeline.run_id
+            self._write(self.queue.set_run_id, self._run_id)
+        if event.kind == "report_delta":
+            # Deltas carry the whole text so far; keep only the latest, at a bounded rate
+            now = time.monotonic()
+            if now - self._last_partial >= PARTIAL_REPORT_INTERVAL:
+                self._last_partial = now
+                self._write(self.queue.set_partial_report, event.data["text"])
+            return
+        self._write(self.queue.add_event, event)
+
+    async def close(self):
+        """Wait for the writes already handed to the recorder"""
+        await asyncio.to_thread(self._writer.shutdown)
+
+
+async def heartbeat(queue: JobQueue, recorder: JobRecorder):
+    """Send heartbeats for a job until it is found to have been handed to another worker"""
+    while not recorder.lost:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        if not await asyncio.to_thread(queue.heartbeat, recorder.job):
+            return
+
+
+async def run_job(queue: JobQueue, job: Job):
+    """Run one claimed job to completion, recording its outcome on the queue"""
+    checkpoints = get_checkpoint_store()
+    pipeline = ResearchPipeline(stream_report=True, write_mode=job.options.get("write_mode", "single"),
+                                fast_threshold=job.options.get("fast_threshold"),
+                                report_store=get_report_store(), checkpoints=checkpoints)
+    recorder = JobRecorder(queue, job, pipeline)
+    pipeline.subscribe(recorder.handle)
+
+    # A requeued or resumed job continues the run it already started
+    run_id = None
+    if job.run_id is not None and checkpoints is not None:
+        if await asyncio.to_thread(checkpoints.load, job.run_id) is not None:
+            run_id = job.run_id
+
+    started = time.perf_counter()
+    run = asyncio.ensure_future(pipeline.run(job.query, run_id=run_id))
+    beat = asyncio.ensure_future(heartbeat(queue, recorder))
+    try:
+        await asyncio.wait([run, beat], return_when=asyncio.FIRST_COMPLETED)
+        if not run.done():
+            # The job was requeued to another worker; stop working on it
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+            print(f"[lost] job {job.id}: requeued to another worker", file=sys.stderr)
+            return
+        # Record the outcome after the job's last events
+        await recorder.close()
+        error = run.exception()
+        if error is not None:
+            recorded = await asyncio.to_thread(queue.fail, job, f"{type(error).__name__}: {error}")
+        else:
+            recorded = await asyncio.to_thread(queue.complete, job, run.result())
+        if not recorded:
+            print(f"[lost] job {job.id}: requeued to another worker before it finished", file=sys.stderr)
+        elif error is not None:
+            print(f"[failed] job {job.id}: {error}", file=sys.stderr)
+        else:
+            print(f"[done] job {job.id} in {time.perf_counter() - started:.0f}s: {job.query}")
+    finally:
+        beat.cancel()
+        run.cancel()
+        await recorder.close()
+
+
+async def work(name: str, concurrency: int, poll_interval: float):
+    """Claim and run jobs, at most `concurrency` at a time, until interrupted"""
+    queue = get_job_queue()
+    running: Set[asyncio.Task] = set()
+    last_requeue = 0.0
+    try:
+        while True:
+            if time.monotonic() - last_requeue >= JOB_STALE_AFTER / 4:
+                last_requeue = time.monotonic()
+                requeued = await asyncio.to_thread(queue.requeue_stale)
+                if requeued:
+                    print(f"[requeued] {requeued} jobs from unresponsive workers")
+
+            while len(running) < concurrency:
+                job = await asyncio.to_thread(queue.claim, name)
+                if job is None:
+                    break
+                print(f"[started] job {job.id} on {name}: {job.query}")
+                task = asyncio.ensure_future(run_job(queue, job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+            # Wake up when a job finishes or it is time to look for new ones
+            if running:
+                await asyncio.wait(running, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(poll_interval)
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        # All jobs in this process share the loop's pooled Serper client and page fetcher
+        await close_serper_client()
+        await close_page_fetcher()
+
+
+def run_process(index: int, concurrency: int, poll_interval: float):
+    name = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    # Each process exports its own metrics, on consecutive ports
+    if os.environ.get("METRICS_PORT"):
+        start_metrics_server(int(os.environ["METRICS_PORT"]) + index)
+    try:
+        asyncio.run(work(name, concurrency, poll_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued research jobs in worker processes.")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes to start")
+    parser.add_argument("--concurrency", type=int, default=2, help="Jobs each process runs at once")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between checks for new jobs")
+    args = parser.parse_args()
+
+    # Workers always use the queue, whatever the UI's setting
+    os.environ["JOB_QUEUE_ENABLED"] = "1"
+
+    print(f"Starting {args.processes} worker processes, {args.concurrency} jobs each, "
+          f"on queue {os.environ.get('JOB_QUEUE_PATH', 'default')}")
+    if args.processes == 1:
+        run_process(0, args.concurrency, args.poll_interval)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_process, args=(i, args.concurrency, args.poll_interval))
+                 for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
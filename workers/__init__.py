@@ -3,5 +3,7 @@ from .planner import planner_agent
 from .web_search import web_search_agent
 from .video_search import video_search_agent
 from .writer import writer_agent
+from .section_writer import outline_agent, section_writer_agent, report_finisher_agent
 
-__all__ = ['planner_agent', 'web_search_agent', 'video_search_agent', 'writer_agent']
\ No newline at end of file
+__all__ = ['planner_agent', 'web_search_agent', 'video_search_agent', 'writer_agent',
+           'outline_agent', 'section_writer_agent', 'report_finisher_agent']
\ No newline at end of file
@@ -0,0 +1,48 @@
+from agents import Agent
+from models.schemas import ReportOutline, ReportExtras
+
+# Agents for the parallel, section-by-section report writing mode
+
+outline_agent = Agent(
+    name="ReportOutlineAgent",
+    instructions="""You are a senior research editor planning the structure of a comprehensive research report.
+
+    You will be given the research query, the scope the report must cover and the list of searches that were run.
+    Produce a report title and 5-8 sections in reading order. Each section needs:
+    - A clear, specific heading
+    - A one or two sentence focus describing exactly what the section covers
+
+    Sections must not overlap. Together they must cover the whole research scope. Do not include an
+    introduction-only or conclusion-only section; each section should carry substantive content.""",
+    model="gpt-4o-mini",
+    output_type=ReportOutline
+)
+
+section_writer_agent = Agent(
+    name="ReportSectionWriter",
+    instructions="""You are a senior researcher writing ONE section of a larger research report.
+
+    You will be given the research query, the heading and focus of your section, the full outline for context,
+    and the research findings most relevant to your section.
+
+    - Write only your section, starting with its heading as a level-2 markdown heading (##)
+    - Aim for 400-600 words of detailed, well-structured markdown (subheadings, lists and tables where useful)
+    - Stay within your section's focus; other sections cover the rest of the outline
+    - Cite sources by their numbers from the findings, e.g. [3], where you use them
+    - Do not write an introduction or conclusion for the whole report""",
+    model="gpt-4o",
+)
+
+report_finisher_agent = Agent(
+    name="ReportFinisher",
+    instructions="""You are a research editor finishing a report that has already been written section by section.
+
+    You will be given the research query, the opening of each section and the video resources that were found.
+    Produce:
+    - A short 2-3 sentence summary of the findings
+    - The most important key insights from the report
+    - Recommended videos, taken only from the video resources provided, with their exact titles, links and creators
+    - Follow-up questions worth researching further""",
+    model="gpt-4o-mini",
+    output_type=ReportExtras
+)
@@ -1,21 +1,22 @@
+from datetime import date
+
 from agents import Agent
 from agents.model_settings import ModelSettings
 from tools.search_tools import video_search_tool
-from tools.date_tools import get_current_date
 
-# Video Search Agent
-video_search_agent = Agent(
-    name="video_search_agent",
-    instructions="""You are an elite video content curator specializing in identifying the highest-quality educational and informational videos.
-    IMPORTANT: Always start by checking the current date using the get_current_date tool before evaluating videos.
+INSTRUCTIONS = """You are an elite video content curator specializing in identifying the highest-quality educational and informational videos.
+    Today's date is {today}.
 
     Your primary responsibilities:
-    First, call the get_current_date tool to determine today's date
-    1. Analyze each video search result thoroughly, focusing on:
-       - Duration (prioritize comprehensive content 10+ minutes, ignore videos under 3 minutes)
-       - Channel reputation and expertise (academic institutions, recognized industry experts)
+    Search once with the video_search_tool. Its results are already ranked best first by a local score
+    for recency, duration and channel reputation, with videos under 3 minutes removed. Results are
+    JSON lines with short keys: t = title, u = url, ch = channel, min = duration in minutes,
+    age = how long ago it was published, s = snippet; r = 1 marks a video another search already
+    found. Keep this order unless a video is clearly off-topic or another is clearly more relevant
+    to the query.
+    1. Review the ranked videos, focusing on:
        - Content depth based on title and snippet
-       - Recency and relevance (prioritize newer content unless historical context is valuable)
+       - Relevance to the research query
        - Educational value over entertainment
 
     2. For each high-quality video you recommend, provide:
@@ -42,8 +43,19 @@ video_search_agent = Agent(
        - Group by subtopics if appropriate
        - Highlight what makes each video especially valuable
 
-    Remember: Your goal is to save researchers time by identifying only the most substantive, informative videos from recognized experts. Quality over quantity.""",
+    Remember: Your goal is to save researchers time by identifying only the most substantive, informative videos from recognized experts. Quality over quantity."""
+
+
+def video_search_instructions(context, agent) -> str:
+    """Instructions with today's date filled in, so the agent needs no date lookup"""
+    return INSTRUCTIONS.format(today=date.today().isoformat())
+
+
+# Video Search Agent
+video_search_agent = Agent(
+    name="video_search_agent",
+    instructions=video_search_instructions,
     model="gpt-4o-mini",
-    tools=[video_search_tool, get_current_date],
+    tools=[video_search_tool],
     model_settings=ModelSettings(tool_choice="required")
 )
\ No newline at end of file
@@ -16,10 +16,14 @@ web_search_agent = Agent(
     5. Prioritize authoritative sources (academic, industry leaders, reputable publications)
     6. Note conflicting viewpoints or controversies if they exist
 
+    Search results are JSON lines with short keys: t = title, u = url, s = snippet, c = text from the
+    page itself (when fetched). A record with r = 1 was already covered by another search; do not
+    summarize it again.
+
     Format requirements:
     - Write 4-5 detailed paragraphs 
     - Use neutral, factual language
-    - Include proper citations for key facts
+    - Cite key facts with markdown links to their sources, e.g. [t](u), using the titles and urls from the search results
     - Structure information from most important to least important
     - Focus exclusively on information directly relevant to the query
 